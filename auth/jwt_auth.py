@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
@@ -6,6 +6,7 @@ from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 import redis
+from utils.local_redis import LocalRedis
 
 load_dotenv()
 
@@ -17,7 +18,21 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_client = redis.from_url(REDIS_URL)
+# "local": Redis en proceso (utils/local_redis.py), sin servidor
+APP_BACKEND = os.getenv("APP_BACKEND", "services")
+_redis_client = None
+
+def get_redis():
+    # El cliente (y su pool) se crea en el primer uso, no al importar
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = LocalRedis() if APP_BACKEND == "local" else redis.from_url(REDIS_URL)
+    return _redis_client
+
+def reset_redis_pool():
+    # Tras un fork: el hijo no debe reutilizar las conexiones del padre
+    if _redis_client is not None:
+        _redis_client.connection_pool.reset()
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -38,11 +53,19 @@ def decode_access_token(token: str):
     except JWTError:
         return None
 
+def get_request_subject(request: Request):
+    # Usuario del bearer token sin ir a la base de datos (no comprueba revocación)
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_access_token(authorization[7:])
+    return payload.get("sub") if payload else None
+
 def revoke_token(token: str, exp_seconds: int):
-    redis_client.setex(f"revoked_{token}", exp_seconds, "1")
+    get_redis().setex(f"revoked_{token}", exp_seconds, "1")
 
 def is_token_revoked(token: str):
-    return redis_client.exists(f"revoked_{token}") == 1
+    return get_redis().exists(f"revoked_{token}") == 1
 
 def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(days=7)):
     to_encode = data.copy()
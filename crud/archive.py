@@ -0,0 +1,48 @@
+import os
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from sqlalchemy import delete, func, insert, literal, union_all
+from models.task import Task
+from models.task_archive import TaskArchive
+from crud.todo_list import NO_SYNC
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+TASK_COLUMNS = [column.name for column in Task.__table__.c]
+
+def archive_completed_tasks(
+    session: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    progress=None
+):
+    # Completadas y creadas antes del corte; lotes pequeños, un commit por lote
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    conditions = (Task.is_completed.is_(True), Task.created_at < cutoff)
+    eligible = select(Task.id).where(*conditions)
+    total = session.exec(select(func.count()).select_from(eligible.subquery())).one() if progress else 0
+    archived = 0
+    while True:
+        # Postgres: el lote queda bloqueado hasta el commit (otro archivado en paralelo salta esas filas);
+        # SQLite ignora FOR UPDATE
+        task_ids = session.exec(eligible.order_by(Task.id).limit(batch_size).with_for_update(skip_locked=True)).all()
+        if not task_ids:
+            break
+        # Las condiciones se repiten: una tarea reabierta o editada desde el SELECT se queda en la tabla caliente
+        batch = (Task.id.in_(task_ids), *conditions)
+        rows = select(*[Task.__table__.c[name] for name in TASK_COLUMNS], literal(datetime.utcnow()).label("archived_at"))
+        session.execute(insert(TaskArchive).from_select(TASK_COLUMNS + ["archived_at"], rows.where(*batch)))
+        moved = session.execute(delete(Task).where(*batch), execution_options=NO_SYNC).rowcount
+        session.commit()
+        archived += moved
+        if progress and total:
+            progress(min(archived / total, 0.99))
+    return archived
+
+def tasks_with_archive():
+    # Tabla caliente + archivo con las mismas columnas, para include_archived
+    return union_all(
+        select(*[Task.__table__.c[name] for name in TASK_COLUMNS]),
+        select(*[TaskArchive.__table__.c[name] for name in TASK_COLUMNS])
+    ).subquery("task_all")
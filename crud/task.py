@@ -1,5 +1,6 @@
 from sqlmodel import Session
 from models.task import Task
+from crud.write import update_returning
 
 def create_task(session: Session, task: Task):
     session.add(task)
@@ -14,13 +15,7 @@ def get_all_tasks(session: Session):
     return session.query(Task).all()
 
 def update_task(session: Session, task_id: int, updated_data: dict):
-    task = session.get(Task, task_id)
-    if task:
-        for key, value in updated_data.items():
-            setattr(task, key, value)
-        session.commit()
-        session. refresh(task)
-    return task
+    return update_returning(session, Task, task_id, updated_data)
 
 def delete_task(session: Session, task_id: int):
     task = session.get(Task, task_id)
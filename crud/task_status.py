@@ -1,5 +1,6 @@
 from sqlmodel import Session
 from models.task_status import TaskStatus
+from crud.write import update_returning
 
 def create_task_status(session: Session, task_status: TaskStatus):
     session.add(task_status)
@@ -14,17 +15,11 @@ def get_all_task_status(session: Session):
     return session.query(TaskStatus).all()
 
 def update_task_status(session: Session, task_status_id: int, updated_data: dict):
-    task_status = session.get(TaskStatus, task_status_id)
-    if task_status:
-        for key, value in updated_data.items():
-            setattr(task_status, key, value)
-        session.commit()
-        session.refresh(task_status)
-    return task_status
+    return update_returning(session, TaskStatus, task_status_id, updated_data)
 
 def delete_task_status(session: Session, task_status_id: int):
     task_status = session.get(TaskStatus, task_status_id)
     if task_status:
         session.delete(task_status)
         session.commit()
-    return task_status
\ No newline at end of file
+    return task_status
@@ -1,5 +1,12 @@
 from sqlmodel import Session
+from sqlalchemy import delete
 from models.todo_list import TodoList
+from models.task import Task
+from models.task_archive import TaskArchive
+from crud.write import update_returning
+
+# Los objetos afectados no se cargan en la sesión
+NO_SYNC = {"synchronize_session": False}
 
 def create_todo_list(session: Session, todo_list: TodoList):
     session.add(todo_list)
@@ -14,17 +21,16 @@ def get_all_todo_list(session: Session):
     return session.query(TodoList).all()
 
 def update_todo_list(session:Session, todo_list_id: int, updated_data: dict):
-    todo_list = session.get(TodoList, todo_list_id)
-    if todo_list:
-        for key, value in updated_data.items():
-            setattr(todo_list, key, value)
-        session.commit()
-        session.refresh(todo_list)
-    return todo_list
+    return update_returning(session, TodoList, todo_list_id, updated_data)
 
 def delete_todo_list(session: Session, todo_list_id: int):
     todo_list = session.get(TodoList, todo_list_id)
     if todo_list:
-        session.delete(todo_list)
+        session.expunge(todo_list)
+        # Un DELETE por tabla en vez de cargar y borrar cada tarea. Los hijos se borran aquí aunque la FK
+        # tenga ON DELETE CASCADE: las bases SQLite creadas antes no la tienen (db/schema.py solo migra Postgres)
+        session.execute(delete(Task).where(Task.todo_list_id == todo_list_id), execution_options=NO_SYNC)
+        session.execute(delete(TaskArchive).where(TaskArchive.todo_list_id == todo_list_id), execution_options=NO_SYNC)
+        session.execute(delete(TodoList).where(TodoList.id == todo_list_id), execution_options=NO_SYNC)
         session.commit()
     return todo_list
@@ -1,5 +1,17 @@
-from sqlmodel import Session
+import os
+from sqlmodel import Session, select
+from sqlalchemy import bindparam, delete, func
 from models.user import User
+from models.todo_list import TodoList
+from models.task import Task
+from models.task_archive import TaskArchive
+from crud.todo_list import NO_SYNC
+from crud.write import update_returning
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+
+# Construida una sola vez: get_current_user la ejecuta en cada request autenticada
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
 
 def create_user(session: Session, user: User):
     session.add(user)
@@ -10,21 +22,55 @@ def create_user(session: Session, user: User):
 def get_user_by_id(session: Session, user_id: int):
     return session.get(User, user_id)
 
+def get_user_by_username(session: Session, username: str):
+    return session.exec(USER_BY_USERNAME, params={"username": username}).first()
+
 def get_all_users(session: Session):
     return session.query(User).all()
 
 def update_user(session: Session, user_id: int, updated_data: dict):
+    return update_returning(session, User, user_id, updated_data)
+
+def delete_user(session: Session, user_id: int):
     user = session.get(User, user_id)
     if user:
-        for key, value in updated_data.items():
-            setattr(user, key, value)
+        session.expunge(user)
+        # Borrado por conjuntos: user -> todolist -> task en tres sentencias
+        owned_lists = select(TodoList.id).where(TodoList.owner_id == user_id)
+        session.execute(delete(Task).where(Task.todo_list_id.in_(owned_lists)), execution_options=NO_SYNC)
+        session.execute(delete(TaskArchive).where(TaskArchive.todo_list_id.in_(owned_lists)), execution_options=NO_SYNC)
+        session.execute(delete(TodoList).where(TodoList.owner_id == user_id), execution_options=NO_SYNC)
+        session.execute(delete(User).where(User.id == user_id), execution_options=NO_SYNC)
         session.commit()
-        session.refresh(user)
     return user
 
-def delete_user(session: Session, user_id: int):
-    user = session.get(User, user_id)
-    if user:
-        session.delete(user)
+def purge_user(session: Session, user_id: int, batch_size: int = PURGE_BATCH_SIZE, progress=None):
+    # Borrado en lotes con commit por lote: ningún lock se mantiene mucho tiempo
+    owned_tasks = select(Task.id).join(TodoList, Task.todo_list_id == TodoList.id).where(TodoList.owner_id == user_id)
+    total_tasks = session.exec(select(func.count()).select_from(owned_tasks.subquery())).one() if progress else 0
+    deleted_tasks = 0
+    while True:
+        task_ids = session.exec(owned_tasks.limit(batch_size)).all()
+        if not task_ids:
+            break
+        session.execute(delete(Task).where(Task.id.in_(task_ids)), execution_options=NO_SYNC)
+        session.commit()
+        deleted_tasks += len(task_ids)
+        if progress and total_tasks:
+            progress(min(deleted_tasks / total_tasks, 0.99))
+    owned_archive = select(TaskArchive.id).join(TodoList, TaskArchive.todo_list_id == TodoList.id).where(TodoList.owner_id == user_id)
+    while True:
+        archived_ids = session.exec(owned_archive.limit(batch_size)).all()
+        if not archived_ids:
+            break
+        session.execute(delete(TaskArchive).where(TaskArchive.id.in_(archived_ids)), execution_options=NO_SYNC)
         session.commit()
-    return user
\ No newline at end of file
+    while True:
+        list_ids = session.exec(select(TodoList.id).where(TodoList.owner_id == user_id).limit(batch_size)).all()
+        if not list_ids:
+            break
+        session.execute(delete(TodoList).where(TodoList.id.in_(list_ids)), execution_options=NO_SYNC)
+        session.commit()
+    session.execute(delete(User).where(User.id == user_id), execution_options=NO_SYNC)
+    session.commit()
+    return deleted_tasks
\ No newline at end of file
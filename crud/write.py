@@ -0,0 +1,44 @@
+from typing import Any, Dict, Optional, Sequence
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+def update_returning(
+    session: Session,
+    model,
+    id: int,
+    values: Dict[str, Any],
+    conditions: Sequence[Any] = (),
+    expected_version: Optional[int] = None
+):
+    where = [model.id == id, *conditions]
+    if expected_version is not None:
+        where.append(model.version == expected_version)
+    if not values:
+        # Sin cambios no hay UPDATE: la versión (ETag) y la caché siguen valiendo; mismas comprobaciones
+        return session.exec(select(model).where(*where)).first()
+    # Un solo round trip: UPDATE ... WHERE id AND <condiciones> [AND version] RETURNING *
+    statement = update(model).where(*where).values(**values, version=model.version + 1).returning(*model.__table__.c)
+    row = session.execute(statement, execution_options={"synchronize_session": False}).first()
+    session.commit()
+    return model(**row._mapping) if row else None
+
+def update_or_raise(
+    session: Session,
+    model,
+    id: int,
+    values: Dict[str, Any],
+    conditions: Sequence[Any] = (),
+    expected_version: Optional[int] = None,
+    not_found: str = "Not found",
+    forbidden: str = "Forbidden"
+):
+    updated = update_returning(session, model, id, values, conditions, expected_version)
+    if updated is not None:
+        return updated
+    # Solo si no se actualizó nada: averiguar por qué
+    if session.exec(select(model.id).where(model.id == id)).first() is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    if conditions and session.exec(select(model.id).where(model.id == id, *conditions)).first() is None:
+        raise HTTPException(status_code=403, detail=forbidden)
+    raise HTTPException(status_code=412, detail="Resource was modified by another request")
@@ -1,14 +1,225 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from db.schema import upgrade_schema
+from fastapi import Request
+from contextlib import contextmanager
+import itertools
+import logging
 import os
+import sqlite3
+import time
+import uuid
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+load_dotenv()
 
-engine = create_engine(DATABASE_URL, echo=True)
+# "local": SQLite y Redis en proceso, sin servicios externos (pruebas, benchmarks)
+APP_BACKEND = os.getenv("APP_BACKEND", "services")
+DATABASE_URL = os.getenv("DATABASE_URL") or ("sqlite:///local.db" if APP_BACKEND == "local" else None)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+# Por proceso: con N workers el total de conexiones es N * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Réplicas de solo lectura, separadas por comas
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Tiempo que una réplica caída queda fuera de la rotación
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Tras una escritura, las lecturas de ese usuario van al primario durante este tiempo
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Caché de SQL compilado de SQLAlchemy, por engine (entradas)
+SQL_QUERY_CACHE_SIZE = int(os.getenv("SQL_QUERY_CACHE_SIZE", "500"))
+# Solo psycopg 3: ejecuciones de una misma consulta antes de prepararla en el servidor ("none" = nunca)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+# Solo SQLite: espera ante un lock antes de fallar, durabilidad y caché de páginas (KiB)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+# Solo sqlite:// (en memoria): espera máxima por la única conexión antes de fallar
+SQLITE_MEMORY_POOL_TIMEOUT_SECONDS = float(os.getenv("SQLITE_MEMORY_POOL_TIMEOUT_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_replica_engines = None
+_replica_down_until = {}
+_replica_counter = itertools.count()
+
+_compiled_cache_stats = {}
+_memory_keepalive = {}
+
+def _count_compiled_cache(conn, cursor, statement, parameters, context, executemany):
+    stats = _compiled_cache_stats[conn.engine]
+    if context.cache_hit == CACHE_HIT:
+        stats["hits"] += 1
+    elif context.cache_hit == CACHE_MISS:
+        stats["misses"] += 1
+
+def _sqlite_pragmas(in_memory: bool):
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: las lecturas no esperan a las escrituras (no aplica en memoria)
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    return apply
+
+def _create_engine(url: str):
+    in_memory = False
+    if url.startswith("sqlite"):
+        database = make_url(url).database
+        in_memory = not database or database == ":memory:"
+        pool_options = {}
+        if in_memory:
+            # Base en memoria con nombre y caché compartida para que todas las conexiones vean la misma.
+            # Pool de una sola conexión: las transacciones van de una en una (sin mezclarse ni chocar por bloqueos de tabla).
+            # Por eso en este modo NO se puede abrir una segunda sesión mientras se tiene otra (p. ej. Session(get_engine())
+            # dentro de una request): esperaría a su propia conexión. Usar primary_session() o la sesión recibida.
+            # Un timeout corto convierte ese error (o una transacción que tarda demasiado) en un fallo rápido
+            memory_uri = f"file:memdb-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            url = f"sqlite:///{memory_uri}&uri=true"
+            pool_options = {
+                "poolclass": QueuePool,
+                "pool_size": 1,
+                "max_overflow": 0,
+                "pool_timeout": SQLITE_MEMORY_POOL_TIMEOUT_SECONDS,
+                "connect_args": {"check_same_thread": False},
+            }
+    else:
+        pool_options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+        }
+    if url.startswith("postgresql+psycopg:"):
+        # psycopg2 no tiene prepared statements del lado del servidor
+        threshold = None if DB_PREPARE_THRESHOLD.lower() == "none" else int(DB_PREPARE_THRESHOLD)
+        pool_options["connect_args"] = {"prepare_threshold": threshold}
+    engine = create_engine(url, echo=SQL_ECHO, query_cache_size=SQL_QUERY_CACHE_SIZE, **pool_options)
+    if in_memory:
+        # La base desaparece al cerrarse su última conexión: esta queda abierta (sin usarse) mientras viva el engine
+        _memory_keepalive[engine] = sqlite3.connect(memory_uri, uri=True, check_same_thread=False)
+    _compiled_cache_stats[engine] = {"hits": 0, "misses": 0}
+    event.listen(engine, "after_cursor_execute", _count_compiled_cache)
+    if url.startswith("sqlite"):
+        event.listen(engine, "connect", _sqlite_pragmas(in_memory))
+    return engine
+
+def compiled_cache_stats():
+    # Por proceso: cada worker tiene sus propios engines
+    stats = {}
+    for engine in [_engine] + (_replica_engines or []):
+        if engine is None:
+            continue
+        cache = engine._compiled_cache
+        stats[engine.url.render_as_string(hide_password=True)] = {
+            "size": len(cache) if cache is not None else 0,
+            "capacity": SQL_QUERY_CACHE_SIZE,
+            **_compiled_cache_stats[engine],
+        }
+    return stats
+
+def get_engine():
+    # El engine se crea en el primer uso, no al importar
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(DATABASE_URL)
+    return _engine
+
+def get_replica_engines():
+    global _replica_engines
+    if _replica_engines is None:
+        _replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+    return _replica_engines
+
+def dispose_engine(close: bool = True):
+    # close=False tras un fork: descarta el pool heredado sin cerrar las conexiones del padre
+    for engine in [_engine] + (_replica_engines or []):
+        if engine is not None:
+            engine.dispose(close=close)
+
+def prewarm_connections(count: int):
+    engine = get_engine()
+    # Nunca más de las que admite el pool (en memoria solo hay una)
+    if engine.pool._max_overflow >= 0:
+        count = min(count, engine.pool.size() + engine.pool._max_overflow)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        # Al cerrarlas vuelven al pool ya abiertas
+        for connection in connections:
+            connection.close()
+    return len(connections)
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
+    upgrade_schema(get_engine())
 
 def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+    with Session(get_engine()) as session:
+        yield session
+
+@contextmanager
+def primary_session(session: Session):
+    # La misma sesión si ya es del primario; si es de una réplica, una nueva en el primario
+    if session.get_bind() is get_engine():
+        yield session
+    else:
+        with Session(get_engine()) as primary:
+            yield primary
+
+def mark_primary_sticky(request: Request):
+    if not DATABASE_REPLICA_URLS:
+        return
+    from auth.jwt_auth import get_redis, get_request_subject
+    username = get_request_subject(request)
+    if username:
+        get_redis().setex(f"primary_sticky:{username}", REPLICA_STICKY_SECONDS, "1")
+
+def _is_primary_sticky(request: Request):
+    from auth.jwt_auth import get_redis, get_request_subject
+    username = get_request_subject(request)
+    if not username:
+        return False
+    try:
+        return get_redis().exists(f"primary_sticky:{username}") == 1
+    except Exception:
+        # Sin Redis no se puede saber si acaba de escribir: el primario siempre es correcto
+        return True
+
+def _connect_replica(replicas):
+    # Round-robin saltando réplicas marcadas como caídas
+    start = next(_replica_counter)
+    for offset in range(len(replicas)):
+        index = (start + offset) % len(replicas)
+        if _replica_down_until.get(index, 0) > time.monotonic():
+            continue
+        session = Session(replicas[index])
+        try:
+            session.connection()
+            return session
+        except Exception as e:
+            session.close()
+            _replica_down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning(f"Read replica {index} unavailable, skipping for {REPLICA_RETRY_SECONDS:.0f}s - {e}")
+    return None
+
+def get_read_session(request: Request):
+    # Para endpoints de solo lectura: réplica si hay, primario si no o si el usuario acaba de escribir
+    replicas = get_replica_engines()
+    session = None
+    if replicas and not _is_primary_sticky(request):
+        session = _connect_replica(replicas)
+    if session is None:
+        session = Session(get_engine())
+    with session:
+        yield session
@@ -0,0 +1,76 @@
+import logging
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+# FKs que pasaron a ON DELETE CASCADE: (tabla, columna, tabla referida)
+CASCADE_FOREIGN_KEYS = (
+    ("task", "todo_list_id", "todolist"),
+    ("todolist", "owner_id", "user"),
+)
+
+# Columnas añadidas a tablas existentes: (tabla, columna, definición)
+ADDED_COLUMNS = (
+    ("task", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("taskstatus", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("todolist", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("user", "version", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+def upgrade_schema(engine):
+    # create_all no modifica tablas que ya existen: los cambios sobre ellas van aquí y deben poder repetirse
+    with engine.begin() as connection:
+        _add_missing_columns(connection)
+        _cascade_foreign_keys(connection)
+    _create_missing_indexes(engine)
+
+def _add_missing_columns(connection):
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    # SQLite no admite ADD COLUMN IF NOT EXISTS: se mira antes en el inspector (en Postgres además evita la carrera)
+    if_not_exists = "IF NOT EXISTS " if connection.dialect.name == "postgresql" else ""
+    for table, column, definition in ADDED_COLUMNS:
+        if column in {existing["name"] for existing in inspector.get_columns(table)}:
+            continue
+        # Con un DEFAULT constante Postgres no reescribe la tabla
+        connection.exec_driver_sql(f"ALTER TABLE {quote(table)} ADD COLUMN {if_not_exists}{quote(column)} {definition}")
+        logger.info(f"Schema upgrade: added {table}.{column}")
+
+def _cascade_foreign_keys(connection):
+    # SQLite no puede cambiar una FK sin recrear la tabla: ahí los borrados de crud/ siguen borrando los hijos
+    if connection.dialect.name != "postgresql":
+        return
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    for table, column, referred in CASCADE_FOREIGN_KEYS:
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] != [column] or fk["options"].get("ondelete", "").upper() == "CASCADE":
+                continue
+            name = quote(fk["name"])
+            # NOT VALID + VALIDATE: el bloqueo exclusivo no dura lo que tarda revisar todas las filas
+            connection.exec_driver_sql(
+                f"ALTER TABLE {quote(table)} DROP CONSTRAINT {name}, "
+                f"ADD CONSTRAINT {name} FOREIGN KEY ({quote(column)}) REFERENCES {quote(referred)} (id) ON DELETE CASCADE NOT VALID"
+            )
+            connection.exec_driver_sql(f"ALTER TABLE {quote(table)} VALIDATE CONSTRAINT {name}")
+            logger.info(f"Schema upgrade: {table}.{column} now cascades on delete")
+
+def _create_missing_indexes(engine):
+    # Índices declarados en los modelos después de que la tabla ya existiera
+    inspector = inspect(engine)
+    missing = []
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [index for index in table.indexes if index.name not in existing]
+    if not missing:
+        return
+    # CONCURRENTLY no bloquea las escrituras mientras se construye, pero no admite transacción: autocommit
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for index in missing:
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+            if connection.dialect.name == "postgresql":
+                ddl = ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+            connection.exec_driver_sql(ddl)
+            logger.info(f"Schema upgrade: created index {index.name}")
@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+
+# Uso: gunicorn -c gunicorn.conf.py main:app
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+# Con APP_BACKEND=local Redis (y una base en memoria) viven en el proceso: un solo worker
+workers = 1 if os.getenv("APP_BACKEND") == "local" else int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# La app se importa una vez en el master y los workers la comparten copy-on-write
+preload_app = True
+
+# Reciclar workers acota el crecimiento de memoria; el jitter evita que todos reinicien a la vez
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# Al apagar o recargar (SIGHUP) se terminan las requests en curso antes de cerrar
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+accesslog = None
+errorlog = "-"
+
+def on_starting(server):
+    # Las tablas se crean una vez en el master, no en cada worker a la vez
+    # (en modo local hay un solo worker y una base en memoria no sobreviviría al dispose)
+    from db.database import create_db_and_tables, dispose_engine
+    if os.getenv("DB_CREATE_TABLES", "true").lower() == "true" and os.getenv("APP_BACKEND") != "local":
+        create_db_and_tables()
+        dispose_engine()
+        os.environ["DB_CREATE_TABLES"] = "false"
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el master no se pueden compartir entre procesos
+    from db.database import dispose_engine
+    from auth.jwt_auth import reset_redis_pool
+    dispose_engine(close=False)
+    reset_redis_pool()
@@ -0,0 +1,217 @@
+import heapq
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory" if os.getenv("APP_BACKEND") == "local" else "redis")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+# Un job en ejecución renueva su lease; si el worker muere, al vencer se recupera y libera su hueco
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "30"))
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    retrying = "retrying"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    type: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    status: JobStatus = JobStatus.queued
+    progress: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[Any] = None
+    owner_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class JobSpec(BaseModel):
+    handler: Callable[..., Any]
+    max_retries: int
+    max_concurrency: int
+    backoff_seconds: float
+
+JOB_TYPES: Dict[str, JobSpec] = {}
+
+def job_type(name: str, max_retries: int = 3, max_concurrency: int = 2, backoff_seconds: float = 5.0):
+    # handler(payload, progress) -> resultado serializable; progress(fraccion 0..1)
+    def register(handler):
+        JOB_TYPES[name] = JobSpec(
+            handler=handler,
+            max_retries=max_retries,
+            max_concurrency=max_concurrency,
+            backoff_seconds=backoff_seconds
+        )
+        return handler
+    return register
+
+class RedisJobBackend:
+    QUEUE_KEY = "jobs:queue"
+    DELAYED_KEY = "jobs:delayed"
+    PROCESSING_KEY = "jobs:processing"
+    LEASES_KEY = "jobs:leases"
+
+    def __init__(self, client):
+        self.client = client
+
+    def save(self, job: Job):
+        job.updated_at = datetime.utcnow()
+        self.client.set(f"jobs:{job.id}", job.model_dump_json(), ex=JOB_TTL_SECONDS)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raw = self.client.get(f"jobs:{job_id}")
+        return Job.model_validate_json(raw) if raw else None
+
+    def push(self, job_id: str, delay: float = 0):
+        if delay > 0:
+            self.client.zadd(self.DELAYED_KEY, {job_id: time.time() + delay})
+        else:
+            self.client.rpush(self.QUEUE_KEY, job_id)
+
+    def pop(self, timeout: float) -> Optional[str]:
+        # Reintentos cuyo backoff ya venció vuelven a la cola
+        for job_id in self.client.zrangebyscore(self.DELAYED_KEY, 0, time.time()):
+            if self.client.zrem(self.DELAYED_KEY, job_id):
+                self.client.rpush(self.QUEUE_KEY, job_id)
+        # El job pasa a la lista de procesamiento en la misma operación: si el worker muere no se pierde
+        job_id = self.client.blmove(self.QUEUE_KEY, self.PROCESSING_KEY, max(1, int(timeout)), "LEFT", "RIGHT")
+        if job_id is None:
+            return None
+        job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+        self.client.zadd(self.LEASES_KEY, {job_id: time.time() + JOB_LEASE_SECONDS})
+        return job_id
+
+    def renew(self, name: str, job_id: str):
+        expires = time.time() + JOB_LEASE_SECONDS
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(self.LEASES_KEY, {job_id: expires}, xx=True)
+        pipe.zadd(f"jobs:running:{name}", {job_id: expires}, xx=True)
+        pipe.execute()
+
+    def finish(self, job_id: str):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrem(self.PROCESSING_KEY, 1, job_id)
+        pipe.zrem(self.LEASES_KEY, job_id)
+        pipe.execute()
+
+    def reclaim_expired(self) -> List[str]:
+        now = time.time()
+        for job_id in self.client.lrange(self.PROCESSING_KEY, 0, -1):
+            # Recién sacado de la cola y aún sin lease (o el worker murió justo ahí): se le da uno
+            if self.client.zscore(self.LEASES_KEY, job_id) is None:
+                self.client.zadd(self.LEASES_KEY, {job_id: now + JOB_LEASE_SECONDS}, nx=True)
+        reclaimed = []
+        for job_id in self.client.zrangebyscore(self.LEASES_KEY, 0, now):
+            # LREM es atómico: cada job lo recupera un solo worker
+            if self.client.lrem(self.PROCESSING_KEY, 1, job_id):
+                reclaimed.append(job_id.decode() if isinstance(job_id, bytes) else job_id)
+            self.client.zrem(self.LEASES_KEY, job_id)
+        return reclaimed
+
+    def acquire(self, name: str, limit: int, job_id: str) -> bool:
+        key = f"jobs:running:{name}"
+        now = time.time()
+        # Una sola transacción (MULTI): dos workers no pueden contar a la vez ni ver un hueco a medio liberar.
+        # Los huecos de workers caídos se liberan cuando vence su lease
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zremrangebyscore(key, 0, now)
+        pipe.zadd(key, {job_id: now + JOB_LEASE_SECONDS})
+        pipe.zcard(key)
+        if pipe.execute()[-1] > limit:
+            self.client.zrem(key, job_id)
+            return False
+        return True
+
+    def release(self, name: str, job_id: str):
+        self.client.zrem(f"jobs:running:{name}", job_id)
+
+class MemoryJobBackend:
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.queue = deque()
+        self.delayed = []
+        self.running: Dict[str, int] = {}
+        self.condition = threading.Condition()
+
+    def save(self, job: Job):
+        job.updated_at = datetime.utcnow()
+        with self.condition:
+            self.jobs[job.id] = job.model_copy(deep=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def push(self, job_id: str, delay: float = 0):
+        with self.condition:
+            if delay > 0:
+                heapq.heappush(self.delayed, (time.monotonic() + delay, job_id))
+            else:
+                self.queue.append(job_id)
+            self.condition.notify()
+
+    def pop(self, timeout: float) -> Optional[str]:
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    self.queue.append(heapq.heappop(self.delayed)[1])
+                if self.queue:
+                    return self.queue.popleft()
+                if now >= deadline:
+                    return None
+                wait = deadline - now
+                if self.delayed:
+                    wait = min(wait, self.delayed[0][0] - now)
+                self.condition.wait(wait)
+
+    # En memoria un worker caído se lleva el proceso entero: no hay leases que recuperar
+    def renew(self, name: str, job_id: str):
+        pass
+
+    def finish(self, job_id: str):
+        pass
+
+    def reclaim_expired(self) -> List[str]:
+        return []
+
+    def acquire(self, name: str, limit: int, job_id: str) -> bool:
+        with self.condition:
+            if self.running.get(name, 0) >= limit:
+                return False
+            self.running[name] = self.running.get(name, 0) + 1
+            return True
+
+    def release(self, name: str, job_id: str):
+        with self.condition:
+            self.running[name] -= 1
+
+_backend = None
+
+def get_job_backend():
+    global _backend
+    if _backend is None:
+        if JOB_BACKEND == "memory":
+            _backend = MemoryJobBackend()
+        else:
+            from auth.jwt_auth import get_redis
+            _backend = RedisJobBackend(get_redis())
+    return _backend
+
+def enqueue(name: str, payload: Dict[str, Any], owner_id: Optional[int] = None) -> Job:
+    backend = get_job_backend()
+    job = Job(type=name, payload=payload, owner_id=owner_id)
+    backend.save(job)
+    backend.push(job.id)
+    return job
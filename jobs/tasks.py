@@ -0,0 +1,22 @@
+from sqlmodel import Session
+from db.database import get_engine
+from crud.user import purge_user
+from crud.archive import archive_completed_tasks
+from jobs.queue import job_type
+from utils.cache import invalidate
+
+@job_type("purge_user", max_retries=3, max_concurrency=1, backoff_seconds=10)
+def purge_user_job(payload, progress):
+    # Idempotente: si falla a mitad, el reintento sigue donde quedó
+    with Session(get_engine()) as session:
+        deleted_tasks = purge_user(session, payload["user_id"], progress=progress)
+    invalidate("users", "tasks:bulk")
+    return {"deleted_tasks": deleted_tasks}
+
+@job_type("archive_tasks", max_retries=3, max_concurrency=1, backoff_seconds=10)
+def archive_tasks_job(payload, progress):
+    # Cada lote se confirma por separado: un reintento solo mueve lo que falte
+    with Session(get_engine()) as session:
+        archived = archive_completed_tasks(session, payload["older_than_days"], progress=progress)
+    invalidate("tasks:bulk")
+    return {"archived_tasks": archived}
@@ -0,0 +1,139 @@
+import argparse
+import logging
+import signal
+import threading
+import time
+from jobs.queue import JOB_BACKEND, JOB_LEASE_SECONDS, JOB_TYPES, JobStatus, get_job_backend
+import jobs.tasks  # registra los tipos de job
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 1.0
+BUSY_RETRY_SECONDS = 1.0
+RECOVERY_INTERVAL_SECONDS = 5.0
+
+def _keep_lease(backend, name: str, job_id: str, stop: threading.Event):
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            backend.renew(name, job_id)
+        except Exception as e:
+            logger.warning(f"Could not renew job lease: {name} {job_id} - {e}")
+
+def _retry_or_fail(backend, job, spec, error: str, exc_info: bool = False):
+    job.error = error
+    if job.attempts <= spec.max_retries:
+        job.status = JobStatus.retrying
+        delay = spec.backoff_seconds * 2 ** (job.attempts - 1)
+        logger.warning(f"Job failed, retrying in {delay:.0f}s: {job.type} {job.id} - {error}")
+        backend.push(job.id, delay=delay)
+    else:
+        job.status = JobStatus.failed
+        logger.error(f"Job failed: {job.type} {job.id} - {error}", exc_info=exc_info)
+
+def run_one(backend, timeout: float = POLL_TIMEOUT) -> bool:
+    job_id = backend.pop(timeout)
+    if job_id is None:
+        return False
+    job = backend.get(job_id)
+    if job is None:
+        # Expiró mientras estaba en cola
+        backend.finish(job_id)
+        return True
+    spec = JOB_TYPES.get(job.type)
+    if spec is None:
+        job.status = JobStatus.failed
+        job.error = f"Unknown job type: {job.type}"
+        backend.save(job)
+        backend.finish(job.id)
+        return True
+    if not backend.acquire(job.type, spec.max_concurrency, job.id):
+        backend.push(job.id, delay=BUSY_RETRY_SECONDS)
+        backend.finish(job.id)
+        return True
+
+    def progress(fraction: float):
+        job.progress = max(0.0, min(1.0, fraction))
+        backend.save(job)
+
+    job.status = JobStatus.running
+    job.attempts += 1
+    backend.save(job)
+    stop_lease = threading.Event()
+    lease = threading.Thread(target=_keep_lease, args=(backend, job.type, job.id, stop_lease), daemon=True)
+    lease.start()
+    try:
+        job.result = spec.handler(job.payload, progress)
+        job.status = JobStatus.succeeded
+        job.progress = 1.0
+        job.error = None
+        logger.info(f"Job succeeded: {job.type} {job.id}")
+    except Exception as e:
+        _retry_or_fail(backend, job, spec, str(e), exc_info=True)
+    finally:
+        stop_lease.set()
+        lease.join()
+        backend.release(job.type, job.id)
+        backend.save(job)
+        backend.finish(job.id)
+    return True
+
+def recover_lost_jobs(backend) -> int:
+    # Jobs cuyo worker murió: el lease venció sin renovarse
+    recovered = 0
+    for job_id in backend.reclaim_expired():
+        job = backend.get(job_id)
+        if job is None:
+            continue
+        recovered += 1
+        spec = JOB_TYPES.get(job.type)
+        if spec is None or job.status != JobStatus.running:
+            # No llegó a ejecutarse: vuelve a la cola sin gastar un intento
+            backend.push(job.id)
+            continue
+        backend.release(job.type, job.id)
+        _retry_or_fail(backend, job, spec, "Worker lost while running the job")
+        backend.save(job)
+    return recovered
+
+def work(stop: threading.Event):
+    backend = get_job_backend()
+    next_recovery = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() >= next_recovery:
+                next_recovery = time.monotonic() + RECOVERY_INTERVAL_SECONDS
+                recover_lost_jobs(backend)
+            run_one(backend)
+        except Exception:
+            # Error del backend (p. ej. Redis caído): no matar el worker
+            logger.exception("Job worker error")
+            stop.wait(POLL_TIMEOUT)
+
+def start_workers(concurrency: int):
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(stop,), name=f"job-worker-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    if JOB_BACKEND == "memory":
+        # Un proceso aparte no ve la cola en memoria de la API
+        parser.error("JOB_BACKEND=memory runs jobs inside the API process (JOB_WORKERS); use JOB_BACKEND=redis for a separate worker")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    stop, threads = start_workers(args.concurrency)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    logger.info(f"Job worker started with {args.concurrency} threads")
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import asyncio
 import logging
 import logging.config
+import os
 import time
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI, Request, Response
 from fastapi.routing import APIRouter
 from routes.user import router as user_router
@@ -8,6 +12,14 @@ from routes.todo_list import router as todo_list_router
 from routes.task import router as task_router
 from routes.task_status import router as status_router
 from routes.auth import router as auth_router
+from routes.jobs import router as jobs_router
+from routes.admin import router as admin_router
+from db.database import dispose_engine, mark_primary_sticky
+from jobs.queue import JOB_BACKEND
+from utils.warmup import warm_up
+from utils.idempotency import idempotent_request
+from utils.profiling import profile_request
+from utils.traffic import capture_enabled, capture_request
 
 
 try:
@@ -21,33 +33,109 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Workers de jobs dentro del proceso de la API (útil con JOB_BACKEND=memory)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1" if os.getenv("APP_BACKEND") == "local" else "0"))
+# Hilos por proceso para los endpoints síncronos (por defecto anyio usa 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+# Espera entre reintentos del warm-up cuando alguna dependencia no respondía al arrancar
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+async def retry_warm_up(app: FastAPI):
+    # En segundo plano: /health/ready solo consulta el estado, nunca ejecuta el warm-up
+    while app.state.warm_up_failed:
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+        _, failed = await to_thread.run_sync(warm_up, app.state.warm_up_failed)
+        app.state.warm_up_failed = failed
+        app.state.ready = not failed
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_time = time.perf_counter()
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    app.state.ready = False
+    _, failed = await to_thread.run_sync(warm_up)
+    app.state.warm_up_failed = failed
+    app.state.ready = not failed
+    warm_up_retry = asyncio.create_task(retry_warm_up(app)) if failed else None
+    job_workers_stop = None
+    if JOB_BACKEND == "memory" and JOB_WORKERS <= 0:
+        # La cola en memoria solo la ve este proceso: sin workers aquí los jobs quedarían en "queued" para siempre
+        raise RuntimeError("JOB_BACKEND=memory requires JOB_WORKERS > 0")
+    if JOB_WORKERS > 0:
+        from jobs.worker import start_workers
+        job_workers_stop, _ = start_workers(JOB_WORKERS)
+        logger.info(f"Started {JOB_WORKERS} in-process job workers")
+    logger.info(f"Startup completed in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+    yield
+    app.state.ready = False
+    if warm_up_retry is not None:
+        warm_up_retry.cancel()
+    if job_workers_stop is not None:
+        job_workers_stop.set()
+    dispose_engine()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(user_router)
 app.include_router(todo_list_router)
 app.include_router(task_router)
 app.include_router(status_router)
 app.include_router(auth_router)
+app.include_router(jobs_router)
+app.include_router(admin_router)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Idempotency-Key en POST: reintentos devuelven la respuesta guardada
+app.middleware("http")(idempotent_request)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
     logger.info(f"Request: {request.method} {request.url.path}")
+    # Muestra de TRAFFIC_CAPTURE_RATE requests para scripts/replay.py
+    capture = capture_enabled()
+    body = await request.body() if capture else b""
     try:
         response: Response = await call_next(request)
     except Exception as e:
         logger.exception(f"Exception during request: {request.method} {request.url.path} - {str(e)}")
         raise
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        try:
+            mark_primary_sticky(request)
+        except Exception as e:
+            logger.warning(f"Could not mark primary sticky: {e}")
     process_time = (time.time() - start_time) * 1000
     logger.info(
         f"Response: {request.method} {request.url.path} "
         f"Status: {response.status_code} "
         f"Time: {process_time:.2f}ms"
     )
+    response.headers["Server-Timing"] = f"app;dur={process_time:.2f}"
+    if capture:
+        try:
+            await to_thread.run_sync(capture_request, request, body, response.status_code, process_time)
+        except Exception as e:
+            logger.warning(f"Could not capture request: {e}")
     return response
 
+# X-Profile (solo admin): perfil de muestreo + timeline SQL/Redis de esa request
+app.middleware("http")(profile_request)
+
 @app.get("/")
 def read_root():
     logger.info("Root endpoint accessed")
-    return {"message": "Welcome to the Task Manager API!"}
\ No newline at end of file
+    return {"message": "Welcome to the Task Manager API!"}
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    if not getattr(app.state, "ready", False):
+        response.status_code = 503
+        return {"status": "starting", "failed": getattr(app.state, "warm_up_failed", [])}
+    return {"status": "ready"}
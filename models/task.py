@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING, Optional
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, text
 from datetime import datetime
 
 if TYPE_CHECKING:
@@ -7,13 +8,26 @@ if TYPE_CHECKING:
     from .task_status import TaskStatus
 
 class Task(SQLModel, table=True):
+    __table_args__ = (
+        # Tablero de una lista ordenado por vencimiento (también sirve para filtrar por todo_list_id)
+        Index("ix_task_todo_list_id_due_date", "todo_list_id", "due_date"),
+        # overdue=true: solo las tareas abiertas
+        Index(
+            "ix_task_open_due_date", "due_date",
+            postgresql_where=text("NOT is_completed"),
+            sqlite_where=text("is_completed = 0")
+        ),
+    )
+
     id: int = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
-    due_date: Optional[datetime] = None
+    due_date: Optional[datetime] = Field(default=None, index=True)
     is_completed: bool
-    todo_list_id: int = Field(foreign_key="todolist.id")
-    status_id: int = Field(foreign_key="taskstatus.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    todo_list_id: int = Field(foreign_key="todolist.id", ondelete="CASCADE")
+    status_id: int = Field(foreign_key="taskstatus.id", index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # Se incrementa en cada UPDATE (ETag / If-Match)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     todo_list: Optional["TodoList"] = Relationship(back_populates="tasks")
     status: Optional["TaskStatus"] = Relationship(back_populates="tasks")
\ No newline at end of file
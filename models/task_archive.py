@@ -0,0 +1,16 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+# Tareas completadas antiguas, fuera de la tabla caliente "task" (mismas columnas y mismos ids)
+class TaskArchive(SQLModel, table=True):
+    id: int = Field(primary_key=True)
+    title: str
+    description: Optional[str] = None
+    due_date: Optional[datetime] = None
+    is_completed: bool
+    todo_list_id: int = Field(foreign_key="todolist.id", ondelete="CASCADE", index=True)
+    status_id: int = Field(foreign_key="taskstatus.id")
+    created_at: datetime
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
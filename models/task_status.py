@@ -12,5 +12,6 @@ class TaskStatus(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
     name: TaskStatusEnum
     color: Optional[str] = None
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     
     tasks: List["Task"] = Relationship(back_populates="status")
\ No newline at end of file
@@ -10,7 +10,8 @@ class TodoList(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
-    owner_id: int = Field(foreign_key="user.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    tasks: List["Task"] = Relationship(back_populates="todo_list")
+    owner_id: int = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    tasks: List["Task"] = Relationship(back_populates="todo_list", passive_deletes=True)
     owner: Optional["User"] = Relationship(back_populates="todo_lists")
\ No newline at end of file
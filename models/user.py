@@ -14,6 +14,7 @@ class User(SQLModel, table=True):
     username: str = Field(unique=True)
     email: str = Field(unique=True)
     hashed_password: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     role: UserRole = Field(default=UserRole.user)
-    todo_lists: List["TodoList"] = Relationship(back_populates="owner")
\ No newline at end of file
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    todo_lists: List["TodoList"] = Relationship(back_populates="owner", passive_deletes=True)
\ No newline at end of file
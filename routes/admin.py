@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+import logging
+import os
+from utils.cache import cache_stats
+from utils.profiling import load_profile
+from utils.query import statement_cache_stats
+from db.database import compiled_cache_stats
+from utils.deps import require_role
+from models.user import UserRole
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_role(UserRole.admin))])
+logger = logging.getLogger(__name__)
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    # Contadores acumulados de todos los workers (hits, misses, esperas por single-flight)
+    return cache_stats()
+
+@router.get("/db/cache/stats")
+def get_db_cache_stats():
+    # Del worker que responde: sentencias reutilizadas y caché de SQL compilado por engine
+    return {
+        "pid": os.getpid(),
+        "statements": statement_cache_stats(),
+        "compiled": compiled_cache_stats(),
+    }
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = Query("json", pattern="^(json|folded)$")):
+    profile = load_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        # Directo a flamegraph.pl o speedscope
+        return PlainTextResponse(profile["folded"] + "\n")
+    return profile
@@ -7,6 +7,7 @@ from auth.jwt_auth import get_password_hash, create_access_token, create_refresh
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta
 import os
+from crud.user import get_user_by_username
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -31,7 +32,7 @@ def revoke_token(token: str):
 
 @router.post("/register")
 def register(data: RegisterRequest, session: Session = Depends(get_session)):
-    if session.exec(select(User).where(User.username == data.username)).first():
+    if get_user_by_username(session, data.username):
         raise HTTPException(status_code=400, detail="Username already exists")
     if session.exec(select(User).where(User.email == data.email)).first():
         raise HTTPException(status_code=400, detail="Email already exists")
@@ -48,7 +49,7 @@ def register(data: RegisterRequest, session: Session = Depends(get_session)):
 
 @router.post("/login")
 def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
+    user = get_user_by_username(session, form_data.username)
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     # Expiración según rol
@@ -71,7 +72,7 @@ def refresh_token(refresh_token: str = Body(...), session: Session = Depends(get
     payload = decode_refresh_token(refresh_token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     # Expiración según rol
@@ -107,7 +108,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -137,7 +138,7 @@ def reset_password(
     if not payload or payload.get("action") != "reset_password":
         raise HTTPException(status_code=400, detail="Invalid or expired token")
     username = payload.get("sub")
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = get_user_by_username(session, username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.hashed_password = get_password_hash(data.new_password)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, HTTPException
+import logging
+from jobs.queue import Job, get_job_backend
+from utils.deps import get_current_user
+from models.user import User, UserRole
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+logger = logging.getLogger(__name__)
+
+@router.get("/{job_id}", response_model=Job)
+def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = get_job_backend().get(job_id)
+    # Un job ajeno se reporta igual que uno inexistente
+    if not job or (current_user.role != UserRole.admin and job.owner_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
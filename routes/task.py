@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Request, Response, status
 from typing import List, Optional
 from sqlmodel import Session, select
-from db.database import get_session
+from sqlalchemy import bindparam
+from db.database import get_read_session, get_session
 from models.task import Task
 from pydantic import BaseModel
 from datetime import datetime
 import logging
 from auth.jwt_auth import oauth2_scheme, decode_access_token, is_token_revoked
 from utils.deps import get_current_user, require_role
+from utils.fields import parse_fields, fields_json
+from utils.cache import cached_response, invalidate
+from utils.query import apply_filters, cached_statement, eq, filter_params, filter_shape, gt, lt, overdue, parse_sort
+from utils.etag import parse_if_match, set_etag
+from crud.write import update_or_raise
+from crud.archive import ARCHIVE_AFTER_DAYS, tasks_with_archive
+from jobs.queue import enqueue
 from models.user import User, UserRole
 from models.todo_list import TodoList
+from crud.user import get_user_by_username
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 logger = logging.getLogger(__name__)
@@ -39,10 +48,44 @@ class TaskResponse(BaseModel):
     todo_list_id: int
     status_id: int
     created_at: datetime
+    version: int
 
     class Config:
         orm_mode = True
 
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+TASK_FILTERS = {
+    "todo_list_id": eq("todo_list_id"),
+    "is_completed": eq("is_completed"),
+    "status_id": eq("status_id"),
+    "due_before": lt("due_date"),
+    "due_after": gt("due_date"),
+    "created_after": gt("created_at"),
+    "created_before": lt("created_at"),
+    "overdue": overdue("due_date", "is_completed"),
+}
+TASK_SORTS = ("id", "title", "due_date", "created_at", "status_id", "is_completed")
+
+def task_cache_tags(todo_list_id: int, owner_id: int):
+    # Una escritura en una tarea afecta a: todas (admin), las del dueño, las de la lista y su vista completa
+    return ("tasks", f"tasks:owner:{owner_id}", f"tasks:list:{todo_list_id}", f"list:{todo_list_id}")
+
+def tasks_statement(selected, include_archived: bool, filters: dict, is_admin: bool, sort: Optional[str]):
+    # Una sentencia por forma (campos, filtros activos, orden, alcance); los valores van como parámetros
+    key = ("tasks", selected, include_archived, filter_shape(TASK_FILTERS, filters), is_admin, sort)
+
+    def build():
+        # El archivo solo se lee si se pide; por defecto la consulta toca solo la tabla caliente
+        columns = tasks_with_archive().c if include_archived else Task.__table__.c
+        query = select(*[columns[f] for f in selected]) if selected else select(Task)
+        query = apply_filters(query, columns, TASK_FILTERS, filters)
+        if not is_admin:
+            # Solo tareas de listas propias
+            query = query.where(columns.todo_list_id.in_(select(TodoList.id).where(TodoList.owner_id == bindparam("current_user_id"))))
+        return query.order_by(*parse_sort(sort, columns, TASK_SORTS)).offset(bindparam("skip")).limit(bindparam("limit"))
+
+    return cached_statement(key, build)
+
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(UserRole.admin, UserRole.user))])
 def create_task(task_in: TaskCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
     todo_list = session.get(TodoList, task_in.todo_list_id)
@@ -59,69 +102,122 @@ def create_task(task_in: TaskCreate, session: Session = Depends(get_session), cu
         status_id=task_in.status_id,
         created_at=datetime.utcnow()
     )
+    tags = task_cache_tags(todo_list.id, todo_list.owner_id)
     session.add(task)
     session.commit()
     session.refresh(task)
+    invalidate(*tags)
     logger.info(f"Task created: {task.title}")
     return task
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    request: Request,
     todo_list_id: Optional[int] = Query(None),
     is_completed: Optional[bool] = Query(None),
+    status_id: Optional[int] = Query(None),
+    due_before: Optional[datetime] = Query(None),
+    due_after: Optional[datetime] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    overdue: Optional[bool] = Query(None, description="Not completed and due date already passed"),
+    sort: Optional[str] = Query(None, description=f"Comma separated, '-' for descending. Allowed: {', '.join(TASK_SORTS)}"),
+    fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(TASK_FIELDS)}"),
+    include_archived: bool = Query(False, description="Also search old completed tasks moved to the archive"),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer)),
-    session: Session = Depends(get_session)
+    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True)),
+    session: Session = Depends(get_read_session)
 ):
-    query = select(Task)
-    if current_user.role == UserRole.admin:
-        if todo_list_id is not None:
-            query = query.where(Task.todo_list_id == todo_list_id)
-        if is_completed is not None:
-            query = query.where(Task.is_completed == is_completed)
-        tasks = session.exec(query.offset(skip).limit(limit)).all()
-        return tasks
+    selected = parse_fields(fields, TASK_FIELDS)
+    if include_archived:
+        selected = selected or TASK_FIELDS
+    filters = {
+        "todo_list_id": todo_list_id,
+        "is_completed": is_completed,
+        "status_id": status_id,
+        "due_before": due_before,
+        "due_after": due_after,
+        "created_after": created_after,
+        "created_before": created_before,
+        "overdue": overdue,
+    }
+    is_admin = current_user.role == UserRole.admin
+    query = tasks_statement(selected, include_archived, filters, is_admin, sort)
+    params = {**filter_params(TASK_FILTERS, filters), "skip": skip, "limit": limit}
+    if not is_admin:
+        params["current_user_id"] = current_user.id
+
+    def load(db: Session):
+        if selected:
+            # Solo las columnas pedidas: sin hidratar objetos Task
+            return fields_json(TaskResponse, selected, db.execute(query, params).all())
+        return fields_json(TaskResponse, TASK_FIELDS, db.exec(query, params=params).all())
+
+    # "tasks:bulk" cubre borrados masivos y archivado
+    scope = "all" if is_admin else f"user:{current_user.id}"
+    if todo_list_id is not None:
+        tag = f"tasks:list:{todo_list_id}"
     else:
-        # Solo tareas de listas propias
-        user_lists = session.exec(select(TodoList.id).where(TodoList.owner_id == current_user.id)).all()
-        # user_lists es una lista de enteros (IDs)
-        query = query.where(Task.todo_list_id.in_(user_lists))
-        tasks = session.exec(query.offset(skip).limit(limit)).all()
-        return tasks
+        tag = "tasks" if is_admin else f"tasks:owner:{current_user.id}"
+    return cached_response("tasks", request, scope, ["tasks:bulk", tag], session, load)
+
+@router.post("/archive", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_role(UserRole.admin))])
+def archive_tasks(
+    older_than_days: int = Query(ARCHIVE_AFTER_DAYS, ge=0, description="Archive completed tasks created more than this many days ago"),
+    current_user: User = Depends(get_current_user)
+):
+    job = enqueue("archive_tasks", {"older_than_days": older_than_days}, owner_id=current_user.id)
+    logger.info(f"Task archival scheduled: older than {older_than_days} days")
+    return {"message": "Task archival scheduled", "job_id": job.id}
 
 @router.put("/{id}", response_model=TaskResponse)
 def update_task(
     id: int,
     task_in: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
-    task = session.get(Task, id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    todo_list = session.get(TodoList, task.todo_list_id)
-    if current_user.role != UserRole.admin and todo_list.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You can only update tasks in your own lists")
-
     # Validar nuevos IDs antes de actualizar
     data = task_in.dict(exclude_unset=True)
+    # Leídos antes del commit, que expira current_user
+    is_admin, current_user_id = current_user.role == UserRole.admin, current_user.id
+    owner_id, previous = current_user_id, None
     if "todo_list_id" in data:
         new_list = session.get(TodoList, data["todo_list_id"])
         if not new_list:
             raise HTTPException(status_code=404, detail="Todo list not found")
         if current_user.role != UserRole.admin and new_list.owner_id != current_user.id:
             raise HTTPException(status_code=403, detail="You can only assign tasks to your own lists")
+        owner_id = new_list.owner_id
+        # Al cambiar de lista también hay que invalidar la de origen
+        previous = session.execute(
+            select(Task.todo_list_id, TodoList.owner_id).join(TodoList, Task.todo_list_id == TodoList.id).where(Task.id == id)
+        ).first()
     if "status_id" in data:
         from models.task_status import TaskStatus
         new_status = session.get(TaskStatus, data["status_id"])
         if not new_status:
             raise HTTPException(status_code=404, detail="Task status not found")
 
-    for field, value in data.items():
-        setattr(task, field, value)
-    session.commit()
-    session.refresh(task)
+    # La comprobación de dueño va en el WHERE del UPDATE
+    conditions = []
+    if current_user.role != UserRole.admin:
+        conditions.append(Task.todo_list_id.in_(select(TodoList.id).where(TodoList.owner_id == current_user.id)))
+    task = update_or_raise(
+        session, Task, id, data,
+        conditions=conditions,
+        expected_version=parse_if_match(if_match),
+        not_found="Task not found",
+        forbidden="You can only update tasks in your own lists"
+    )
+    if is_admin and "todo_list_id" not in data:
+        owner_id = session.get(TodoList, task.todo_list_id).owner_id
+    if data:
+        invalidate(*task_cache_tags(task.todo_list_id, owner_id), *(task_cache_tags(*previous) if previous else ()))
+    set_etag(response, task.version)
     logger.info(f"Task updated: {task.title}")
     return task
 
@@ -133,8 +229,10 @@ def delete_task(id: int, current_user: User = Depends(get_current_user), session
     todo_list = session.get(TodoList, task.todo_list_id)
     if current_user.role != UserRole.admin and todo_list.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete tasks in your own lists")
+    todo_list_id, owner_id = todo_list.id, todo_list.owner_id
     session.delete(task)
     session.commit()
+    invalidate(*task_cache_tags(todo_list_id, owner_id))
     logger.info(f"Task deleted: {id}")
     return {"message": "Task deleted successfully"}
 
@@ -146,7 +244,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
\ No newline at end of file
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from typing import List, Optional
 from sqlmodel import Session, select
-from db.database import get_session
+from db.database import get_read_session, get_session
 from models.task_status import TaskStatus
-from pydantic import BaseModel
+from crud.task_status import get_all_task_status
+from crud.write import update_or_raise
+from utils.etag import parse_if_match, set_etag
+from utils.cache import cached_response, invalidate
+from pydantic import BaseModel, TypeAdapter
 import logging
 from auth.jwt_auth import oauth2_scheme, decode_access_token, is_token_revoked
 from utils.deps import get_current_user, require_role
 from models.user import User, UserRole
+from crud.user import get_user_by_username
 
 router = APIRouter(prefix="/status", tags=["status"])
 logger = logging.getLogger(__name__)
@@ -24,17 +29,24 @@ class TaskStatusResponse(BaseModel):
     id: int
     name: str
     color: Optional[str] = None
+    version: int
 
     class Config:
         orm_mode = True
 
+STATUSES_ADAPTER = TypeAdapter(List[TaskStatusResponse])
+
+def statuses_json(session: Session) -> bytes:
+    # También lo usa el warm-up para dejar la caché de GET /status/ llena
+    return STATUSES_ADAPTER.dump_json(STATUSES_ADAPTER.validate_python(get_all_task_status(session), from_attributes=True))
+
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     if is_token_revoked(token):
         raise HTTPException(status_code=401, detail="Token has been revoked")
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -53,17 +65,18 @@ def create_status(
     session.add(status_obj)
     session.commit()
     session.refresh(status_obj)
+    invalidate("statuses")
     logger.info(f"Status created: {status_obj.name}")
     return status_obj
 
 @router.get(
     "/", 
     response_model=List[TaskStatusResponse], 
-    dependencies=[Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer))]
+    dependencies=[Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True))]
 )
-def get_statuses(session: Session = Depends(get_session)):
-    statuses = session.exec(select(TaskStatus)).all()
-    return statuses
+def get_statuses(request: Request, session: Session = Depends(get_read_session)):
+    # Datos de referencia leídos en casi cada request: caché compartida entre workers
+    return cached_response("statuses", request, "all", ["statuses"], session, statuses_json)
 
 @router.put(
     "/{id}", 
@@ -73,17 +86,23 @@ def get_statuses(session: Session = Depends(get_session)):
 def update_status(
     id: int, 
     status_in: TaskStatusUpdate, 
+    response: Response,
+    if_match: Optional[str] = Header(None),
     session: Session = Depends(get_session)
 ):
-    status_obj = session.get(TaskStatus, id)
-    if not status_obj:
-        raise HTTPException(status_code=404, detail="Status not found")
+    values = {}
     if status_in.name is not None:
-        status_obj.name = status_in.name
+        values["name"] = status_in.name
     if status_in.color is not None:
-        status_obj.color = status_in.color
-    session.commit()
-    session.refresh(status_obj)
+        values["color"] = status_in.color
+    status_obj = update_or_raise(
+        session, TaskStatus, id, values,
+        expected_version=parse_if_match(if_match),
+        not_found="Status not found"
+    )
+    set_etag(response, status_obj.version)
+    if values:
+        invalidate("statuses")
     logger.info(f"Status updated: {status_obj.name}")
     return status_obj
 
@@ -101,5 +120,6 @@ def delete_status(
         raise HTTPException(status_code=404, detail="Status not found")
     session.delete(status_obj)
     session.commit()
+    invalidate("statuses")
     logger.info(f"Status deleted: {id}")
     return {"message": "Status deleted successfully"}
\ No newline at end of file
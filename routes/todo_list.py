@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Request, Response, status
 from typing import List, Optional
+from pydantic import TypeAdapter
 from sqlmodel import Session, select
-from db.database import get_session
+from sqlalchemy import bindparam
+from sqlalchemy.orm import joinedload, selectinload
+from db.database import get_read_session, get_session
 from models.todo_list import TodoList
+from models.task import Task
+from crud.todo_list import delete_todo_list
 from models.user import User
 from pydantic import BaseModel
+from datetime import datetime
 import logging
 from auth.jwt_auth import oauth2_scheme, decode_access_token, is_token_revoked
 from utils.deps import get_current_user, require_role
+from utils.fields import parse_fields, fields_json
+from utils.cache import cached_response, invalidate
+from utils.query import apply_filters, cached_statement, eq, filter_params, filter_shape, gt, lt, parse_sort
+from utils.etag import parse_if_match, set_etag
+from crud.write import update_or_raise
+from routes.task import TaskResponse
+from routes.task_status import TaskStatusResponse
 from models.user import UserRole
+from crud.user import get_user_by_username
 
 router = APIRouter(prefix="/lists", tags=["lists"])
 logger = logging.getLogger(__name__)
@@ -28,27 +42,80 @@ class TodoListResponse(BaseModel):
     description: Optional[str] = None
     owner_username: str
     created_at: str
+    version: int
 
     class Config:
         orm_mode = True
 
+class TodoListFullResponse(TodoListResponse):
+    tasks: List[TaskResponse]
+    statuses: List[TaskStatusResponse]
+
+MAX_FULL_LISTS = 50
+LISTS_ADAPTER = TypeAdapter(List[TodoListResponse])
+FULL_LISTS_ADAPTER = TypeAdapter(List[TodoListFullResponse])
+
+LIST_COLUMNS = {
+    "id": TodoList.id,
+    "title": TodoList.title,
+    "description": TodoList.description,
+    "owner_username": User.username.label("owner_username"),
+    "created_at": TodoList.created_at,
+    "version": TodoList.version,
+}
+# Columnas para filtrar y ordenar (sin labels)
+LIST_QUERY_COLUMNS = {
+    "id": TodoList.id,
+    "title": TodoList.title,
+    "owner_id": TodoList.owner_id,
+    "created_at": TodoList.created_at,
+    "owner_username": User.username,
+    "email": User.email,
+}
+LIST_FILTERS = {
+    "id": eq("id"),
+    "owner_id": eq("owner_id"),
+    "username": eq("owner_username"),
+    "email": eq("email"),
+    "created_after": gt("created_at"),
+    "created_before": lt("created_at"),
+}
+LIST_SORTS = ("id", "title", "created_at", "owner_username")
+
+def list_cache_tags(todo_list_id: int, owner_id: int):
+    return ("lists", f"lists:owner:{owner_id}", f"list:{todo_list_id}")
+
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     if is_token_revoked(token):
         raise HTTPException(status_code=401, detail="Token has been revoked")
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+def lists_statement(selected, filters: dict, is_admin: bool, sort: Optional[str]):
+    key = ("lists", selected, filter_shape(LIST_FILTERS, filters), is_admin, sort)
+
+    def build():
+        columns = [LIST_COLUMNS[f] for f in selected] if selected else [TodoList, User]
+        query = select(*columns).select_from(TodoList).join(User, TodoList.owner_id == User.id)
+        query = apply_filters(query, LIST_QUERY_COLUMNS, LIST_FILTERS, filters)
+        # Admin: ve todas, user/viewer: solo sus propias listas
+        if not is_admin:
+            query = query.where(TodoList.owner_id == bindparam("current_user_id"))
+        return query.order_by(*parse_sort(sort, LIST_QUERY_COLUMNS, LIST_SORTS)).offset(bindparam("skip")).limit(bindparam("limit"))
+
+    return cached_statement(key, build)
+
 @router.post("/", response_model=TodoListResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(UserRole.admin, UserRole.user))])
 def create_list(list_in: TodoListCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
     # Admin puede crear listas para cualquiera, user solo para sí mismo
     if current_user.role == UserRole.user and list_in.owner_username != current_user.username:
         raise HTTPException(status_code=403, detail="You can only create lists for yourself")
-    owner = session.exec(select(User).where(User.username == list_in.owner_username)).first()
+    owner = get_user_by_username(session, list_in.owner_username)
     if not owner:
         raise HTTPException(status_code=404, detail="Owner user not found")
     todo_list = TodoList(
@@ -59,74 +126,178 @@ def create_list(list_in: TodoListCreate, session: Session = Depends(get_session)
     session.add(todo_list)
     session.commit()
     session.refresh(todo_list)
+    invalidate(*list_cache_tags(todo_list.id, todo_list.owner_id))
     logger.info(f"User created: {owner.username}")
     return TodoListResponse(
         id=todo_list.id,
         title=todo_list.title,
         description=todo_list.description,
         owner_username=owner.username,
-        created_at=todo_list.created_at.isoformat()
+        created_at=todo_list.created_at.isoformat(),
+        version=todo_list.version
     )
 
 @router.get("/", response_model=List[TodoListResponse])
 def get_lists(
+    request: Request,
     id: Optional[int] = Query(None),
     owner_id: Optional[int] = Query(None),
     username: Optional[str] = Query(None),
     email: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    sort: Optional[str] = Query(None, description=f"Comma separated, '-' for descending. Allowed: {', '.join(LIST_SORTS)}"),
+    fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(LIST_COLUMNS)}"),
     skip: int = 0,
     limit: int = 100,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer))
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True))
 ):
-    # Admin: ve todas, user/viewer: solo sus propias listas
-    query = select(TodoList, User).join(User, TodoList.owner_id == User.id)
-    if id is not None:
-        query = query.where(TodoList.id == id)
-    if owner_id is not None:
-        query = query.where(TodoList.owner_id == owner_id)
-    if username is not None:
-        query = query.where(User.username == username)
-    if email is not None:
-        query = query.where(User.email == email)
-    results = session.exec(query.offset(skip).limit(limit)).all()
-    response = [
-        TodoListResponse(
+    selected = parse_fields(fields, LIST_COLUMNS)
+    filters = {
+        "id": id,
+        "owner_id": owner_id,
+        "username": username,
+        "email": email,
+        "created_after": created_after,
+        "created_before": created_before,
+    }
+    is_admin = current_user.role == UserRole.admin
+    query = lists_statement(selected, filters, is_admin, sort)
+    params = {**filter_params(LIST_FILTERS, filters), "skip": skip, "limit": limit}
+    if not is_admin:
+        params["current_user_id"] = current_user.id
+
+    def load(db: Session):
+        if selected:
+            rows = [
+                {**row._mapping, "created_at": row.created_at.isoformat()} if "created_at" in selected else row._mapping
+                for row in db.execute(query, params).all()
+            ]
+            return fields_json(TodoListResponse, selected, rows)
+        results = db.exec(query, params=params).all()
+        return LISTS_ADAPTER.dump_json([
+            TodoListResponse(
+                id=todo_list.id,
+                title=todo_list.title,
+                description=todo_list.description,
+                owner_username=user.username,
+                created_at=todo_list.created_at.isoformat(),
+                version=todo_list.version
+            )
+            for todo_list, user in results
+        ])
+
+    # "users": un cambio de username cambia owner_username en las respuestas
+    if not is_admin:
+        scope, tag = f"user:{current_user.id}", f"lists:owner:{current_user.id}"
+    else:
+        scope, tag = "all", f"lists:owner:{owner_id}" if owner_id is not None else "lists"
+    return cached_response("lists", request, scope, ["users", tag], session, load)
+
+def load_full_lists(session: Session, ids: List[int], current_user: User) -> List[TodoListFullResponse]:
+    # Dos queries en total: listas + dueño (join) y tareas + estado (selectin)
+    query = (
+        select(TodoList)
+        .where(TodoList.id.in_(ids))
+        .options(
+            joinedload(TodoList.owner),
+            selectinload(TodoList.tasks).joinedload(Task.status),
+        )
+    )
+    todo_lists = {todo_list.id: todo_list for todo_list in session.exec(query).all()}
+    missing = [list_id for list_id in ids if list_id not in todo_lists]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"List not found: {', '.join(map(str, missing))}")
+    if current_user.role != UserRole.admin and any(l.owner_id != current_user.id for l in todo_lists.values()):
+        raise HTTPException(status_code=403, detail="You can only view your own lists")
+    response = []
+    for list_id in ids:
+        todo_list = todo_lists[list_id]
+        tasks = sorted(todo_list.tasks, key=lambda t: t.id)
+        statuses = {t.status.id: t.status for t in tasks if t.status is not None}
+        response.append(TodoListFullResponse(
             id=todo_list.id,
             title=todo_list.title,
             description=todo_list.description,
-            owner_username=user.username,
-            created_at=todo_list.created_at.isoformat()
-        )
-        for todo_list, user in results
-    ]
-    if current_user.role == UserRole.admin:
-        return response
-    else:
-        # Solo listas propias
-        response = [l for l in response if l.owner_username == current_user.username]
-        return response
+            owner_username=todo_list.owner.username,
+            created_at=todo_list.created_at.isoformat(),
+            version=todo_list.version,
+            tasks=[TaskResponse.model_validate(t, from_attributes=True) for t in tasks],
+            statuses=[TaskStatusResponse.model_validate(st, from_attributes=True) for st in statuses.values()]
+        ))
+    return response
+
+def full_cache_tags(ids: List[int]):
+    # Incluye dueño (username), tareas y nombres de estados
+    return ["users", "tasks:bulk", "statuses", *(f"list:{list_id}" for list_id in ids)]
+
+@router.get("/full", response_model=List[TodoListFullResponse])
+def get_full_lists(
+    request: Request,
+    ids: List[int] = Query(..., description=f"Up to {MAX_FULL_LISTS} list ids"),
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True))
+):
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_FULL_LISTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FULL_LISTS} lists per request")
+    return cached_response(
+        "lists_full", request, f"user:{current_user.id}", full_cache_tags(ids), session,
+        lambda db: FULL_LISTS_ADAPTER.dump_json(load_full_lists(db, ids, current_user))
+    )
+
+@router.get("/{id}/full", response_model=TodoListFullResponse)
+def get_full_list(
+    id: int,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True))
+):
+    return cached_response(
+        "lists_full", request, f"user:{current_user.id}", full_cache_tags([id]), session,
+        lambda db: load_full_lists(db, [id], current_user)[0].model_dump_json().encode()
+    )
 
 @router.put("/{id}", response_model=TodoListResponse)
-def update_list(id: int, list_in: TodoListUpdate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    todo_list = session.get(TodoList, id)
-    if not todo_list:
-        raise HTTPException(status_code=404, detail="List not found")
-    if current_user.role != UserRole.admin and todo_list.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You can only update your own lists")
+def update_list(
+    id: int,
+    list_in: TodoListUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    values = {}
     if list_in.title is not None:
-        todo_list.title = list_in.title
+        values["title"] = list_in.title
     if list_in.description is not None:
-        todo_list.description = list_in.description
-    session.commit()
-    session.refresh(todo_list)
-    owner = session.get(User, todo_list.owner_id)
+        values["description"] = list_in.description
+    # Leídos antes del commit, que expira current_user
+    current_user_id, current_username = current_user.id, current_user.username
+    conditions = [TodoList.owner_id == current_user_id] if current_user.role != UserRole.admin else []
+    todo_list = update_or_raise(
+        session, TodoList, id, values,
+        conditions=conditions,
+        expected_version=parse_if_match(if_match),
+        not_found="List not found",
+        forbidden="You can only update your own lists"
+    )
+    # Casi siempre el dueño es quien edita: sin query extra
+    if todo_list.owner_id == current_user_id:
+        owner_username = current_username
+    else:
+        owner_username = session.get(User, todo_list.owner_id).username
+    if values:
+        invalidate(*list_cache_tags(todo_list.id, todo_list.owner_id))
+    set_etag(response, todo_list.version)
     return TodoListResponse(
         id=todo_list.id,
         title=todo_list.title,
         description=todo_list.description,
-        owner_username=owner.username,
-        created_at=todo_list.created_at.isoformat()
+        owner_username=owner_username,
+        created_at=todo_list.created_at.isoformat(),
+        version=todo_list.version
     )
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -136,7 +307,9 @@ def delete_list(id: int, session: Session = Depends(get_session), current_user:
         raise HTTPException(status_code=404, detail="List not found")
     if current_user.role != UserRole.admin and todo_list.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete your own lists")
-    session.delete(todo_list)
-    session.commit()
+    owner_id = todo_list.owner_id
+    delete_todo_list(session, id)
+    # Con la lista se van sus tareas
+    invalidate(*list_cache_tags(id, owner_id), "tasks", f"tasks:owner:{owner_id}", f"tasks:list:{id}")
     logger.info(f"Task deleted: {id}")
     return {"message": "List deleted successfully"}
\ No newline at end of file
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response, status
 from typing import List, Optional
 from sqlmodel import Session, select
-from db.database import get_session
+from sqlalchemy import bindparam
+from db.database import get_read_session, get_session
 from models.user import User, UserRole
+from crud.user import delete_user as delete_user_rows, get_user_by_username
+from jobs.queue import enqueue
 from pydantic import BaseModel
 import logging
 from auth.jwt_auth import oauth2_scheme, decode_access_token, is_token_revoked, get_password_hash
 from utils.deps import get_current_user, require_role, require_self_or_admin
+from utils.fields import parse_fields, fields_response
+from utils.query import apply_filters, cached_statement, eq, filter_params, filter_shape, gt, lt, parse_sort
+from utils.etag import parse_if_match, set_etag
+from crud.write import update_or_raise
+from utils.cache import invalidate
+from datetime import datetime
 
 router = APIRouter(prefix="/users", tags=["users"])
 logger = logging.getLogger(__name__)
@@ -20,29 +29,65 @@ class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[str] = None
 
+# hashed_password nunca se puede pedir
+USER_FIELDS = ("id", "username", "email", "created_at", "role", "version")
+USER_FILTERS = {
+    "id": eq("id"),
+    "username": eq("username"),
+    "email": eq("email"),
+    "role": eq("role"),
+    "created_after": gt("created_at"),
+    "created_before": lt("created_at"),
+}
+USER_SORTS = ("id", "username", "email", "created_at", "role")
+
+def users_statement(selected, filters: dict, sort: Optional[str]):
+    key = ("users", selected, filter_shape(USER_FILTERS, filters), sort)
+
+    def build():
+        columns = User.__table__.c
+        query = select(*[columns[f] for f in selected]) if selected else select(User)
+        query = apply_filters(query, columns, USER_FILTERS, filters)
+        return query.order_by(*parse_sort(sort, columns, USER_SORTS)).offset(bindparam("skip")).limit(bindparam("limit"))
+
+    return cached_statement(key, build)
+
 @router.get("/", response_model=List[User])
 def get_users(
     id: Optional[int] = Query(None),
     username: Optional[str] = Query(None),
     email: Optional[str] = Query(None),
+    role: Optional[UserRole] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    sort: Optional[str] = Query(None, description=f"Comma separated, '-' for descending. Allowed: {', '.join(USER_SORTS)}"),
+    fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(USER_FIELDS)}"),
     skip: int = 0,
     limit: int = 100,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer))
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(require_role(UserRole.admin, UserRole.user, UserRole.viewer, read_only=True))
 ):
+    selected = parse_fields(fields, USER_FIELDS)
     # Admin: puede ver todos. User/viewer: solo su propio usuario.
     if current_user.role == UserRole.admin:
-        query = select(User)
-        if id is not None:
-            query = query.where(User.id == id)
-        if username is not None:
-            query = query.where(User.username == username)
-        if email is not None:
-            query = query.where(User.email == email)
-        users = session.exec(query.offset(skip).limit(limit)).all()
+        filters = {
+            "id": id,
+            "username": username,
+            "email": email,
+            "role": role,
+            "created_after": created_after,
+            "created_before": created_before,
+        }
+        query = users_statement(selected, filters, sort)
+        params = {**filter_params(USER_FILTERS, filters), "skip": skip, "limit": limit}
+        if selected:
+            return fields_response(User, selected, session.execute(query, params).all())
+        users = session.exec(query, params=params).all()
         return users
     else:
         # Solo puede ver su propio usuario
+        if selected:
+            return fields_response(User, selected, [current_user])
         return [current_user]
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(UserRole.admin))])
@@ -65,26 +110,35 @@ def create_user(user: UserCreate, session: Session = Depends(get_session)):
 def update_user(
     id: int,
     user: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     # Admin puede actualizar cualquiera, user/viewer solo el suyo
     if current_user.role != UserRole.admin and current_user.id != id:
         raise HTTPException(status_code=403, detail="You can only update your own user")
-    db_user = session.get(User, id)
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    values = {}
     if user.username is not None:
-        db_user.username = user.username
+        values["username"] = user.username
     if user.email is not None:
-        db_user.email = user.email
-    session.commit()
-    session.refresh(db_user)
+        values["email"] = user.email
+    db_user = update_or_raise(
+        session, User, id, values,
+        expected_version=parse_if_match(if_match),
+        not_found="User not found"
+    )
+    # username aparece en las respuestas de listas
+    if values:
+        invalidate("users")
+    set_etag(response, db_user.version)
     return db_user
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     id: int,
+    response: Response,
+    purge_async: bool = Query(False, description="Delete in batches after responding (202), for users with many lists/tasks"),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -94,8 +148,13 @@ def delete_user(
     db_user = session.get(User, id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    session.delete(db_user)
-    session.commit()
+    if purge_async:
+        job = enqueue("purge_user", {"user_id": id}, owner_id=current_user.id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        logger.info(f"User purge scheduled: {id} (job {job.id})")
+        return {"message": "User deletion scheduled", "job_id": job.id}
+    delete_user_rows(session, id)
+    invalidate("users", "tasks:bulk")
     logger.info(f"User deleted: {id}")
     return {"message": "User deleted successfully"}
 
@@ -107,7 +166,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
\ No newline at end of file
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_URL = "sqlite:///bench_queries.db"
+
+# Uso: python scripts/bench_queries.py [--url postgresql+psycopg://...] [--iterations 2000]
+# Compara, por consulta, el coste de CPU en el cliente de reconstruir la sentencia en cada
+# request (como antes) frente a reutilizar la sentencia ya construida
+def parse_args():
+    parser = argparse.ArgumentParser(description="CPU cost per hot query: rebuilt vs cached statements")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Database URL (must already contain data unless --seed)")
+    parser.add_argument("--seed", action="store_true", help="Generate a small dataset first (DELETES existing data)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    return parser.parse_args()
+
+def measure(run, iterations: int) -> float:
+    for _ in range(min(iterations, 100)):
+        run()
+    start = time.process_time()
+    for _ in range(iterations):
+        run()
+    return (time.process_time() - start) / iterations * 1_000_000
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_ECHO", "false")
+
+    from sqlmodel import Session, select
+    from db.database import get_engine
+    from crud.user import get_user_by_username
+    from models.user import User
+    from routes.task import tasks_statement, TASK_FILTERS
+    from routes.todo_list import lists_statement, LIST_FILTERS
+    from routes.user import users_statement, USER_FILTERS
+    from utils.query import clear_statement_cache, filter_params
+
+    if args.seed or args.url == DEFAULT_URL:
+        from seeder import generate_data, parse_status_weights
+        generate_data(
+            users=args.users, lists_per_user=5, tasks_per_list=20,
+            status_weights=parse_status_weights("pendiente=0.5,en progreso=0.2,completada=0.3"),
+            due_spread_days=60, text_length=40, seed=42, base_date=datetime(2026, 1, 1)
+        )
+
+    task_filters = {"todo_list_id": 3, "is_completed": False, "due_before": datetime(2026, 3, 1), "overdue": None}
+    list_filters = {"owner_id": 2, "created_after": datetime(2025, 1, 1)}
+    user_filters = {"role": None, "created_after": datetime(2025, 1, 1)}
+    page = {"skip": 0, "limit": 20}
+
+    with Session(get_engine()) as session:
+        def current_user_rebuilt():
+            session.exec(select(User).where(User.username == "user2")).first()
+
+        def current_user_cached():
+            get_user_by_username(session, "user2")
+
+        def tasks(cached):
+            def run():
+                if not cached:
+                    clear_statement_cache()
+                query = tasks_statement(None, False, task_filters, False, "due_date")
+                session.exec(query, params={**filter_params(TASK_FILTERS, task_filters), **page, "current_user_id": 1}).all()
+            return run
+
+        def lists(cached):
+            def run():
+                if not cached:
+                    clear_statement_cache()
+                query = lists_statement(("id", "title", "owner_username"), list_filters, True, "-created_at")
+                session.execute(query, {**filter_params(LIST_FILTERS, list_filters), **page}).all()
+            return run
+
+        def users(cached):
+            def run():
+                if not cached:
+                    clear_statement_cache()
+                query = users_statement(None, user_filters, "username")
+                session.exec(query, params={**filter_params(USER_FILTERS, user_filters), **page}).all()
+            return run
+
+        cases = [
+            ("get_current_user", current_user_rebuilt, current_user_cached),
+            ("GET /tasks", tasks(False), tasks(True)),
+            ("GET /lists", lists(False), lists(True)),
+            ("GET /users", users(False), users(True)),
+        ]
+        print(f"{get_engine().dialect.name}, {args.iterations} iterations, CPU time per query")
+        print(f"{'query':<18} {'rebuilt':>10} {'cached':>10} {'saved':>7}")
+        for name, rebuilt, cached in cases:
+            before = measure(rebuilt, args.iterations)
+            after = measure(cached, args.iterations)
+            print(f"{name:<18} {before:>8.0f}us {after:>8.0f}us {(before - after) / before * 100:>6.0f}%")
+
+if __name__ == "__main__":
+    main()
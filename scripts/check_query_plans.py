@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Base en memoria: no deja ficheros en el directorio de trabajo
+DEFAULT_URL = "sqlite://"
+
+# Uso: python scripts/check_query_plans.py [--url postgresql+psycopg://...]
+# Comprueba que las consultas con un índice declarado para ellas lo usan de verdad; termina con código 1 si no
+def parse_args():
+    parser = argparse.ArgumentParser(description="Assert that hot queries use the indexes declared for them")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Database URL (tables are created if missing)")
+    return parser.parse_args()
+
+def explain(connection, statement, params) -> str:
+    compiled = statement.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + compiled.string, tuple(values[name] for name in compiled.positiontup)
+        ).all()
+        return "\n".join(row[-1] for row in rows)
+    # Con pocas filas Postgres prefiere un seq scan: aquí interesa si el índice es utilizable
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    return "\n".join(row[0] for row in connection.exec_driver_sql("EXPLAIN " + compiled.string, values).all())
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("SQL_ECHO", "false")
+
+    from db.database import create_db_and_tables, get_engine
+    import models.task_archive, models.task_status, models.todo_list, models.user  # noqa: F401 (tablas)
+    from routes.task import TASK_FILTERS, tasks_statement
+    from utils.query import filter_params
+
+    create_db_and_tables()
+    no_filters = {name: None for name in TASK_FILTERS}
+    cases = [
+        ("GET /tasks?overdue=true", {**no_filters, "overdue": True}, "ix_task_open_due_date"),
+        ("GET /tasks?todo_list_id=N", {**no_filters, "todo_list_id": 1}, "ix_task_todo_list_id_due_date"),
+    ]
+    failed = False
+    with get_engine().connect() as connection:
+        for name, filters, index in cases:
+            statement = tasks_statement(None, False, filters, True, "due_date")
+            params = {**filter_params(TASK_FILTERS, filters), "skip": 0, "limit": 20, "current_user_id": 1}
+            plan = explain(connection, statement, params)
+            ok = index in plan
+            failed = failed or not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: expected {index}")
+            if not ok:
+                print("     " + plan.replace("\n", "\n     "))
+            connection.rollback()
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import re
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Uso: python scripts/replay.py traffic.jsonl --base-url http://127.0.0.1:8000 --speed 10
+# Repite el tráfico capturado con TRAFFIC_CAPTURE_FILE contra una build local sembrada con seeder.py
+# Usuarios de `seeder.py --users N` (user1 es admin, contraseña GENERATED_PASSWORD). Ese dataset no tiene
+# viewers: sus requests se saltan salvo que se pase --login viewer=USUARIO:CLAVE
+DEFAULT_LOGINS = {
+    "admin": "user1:benchpass",
+    "user": "user2:benchpass",
+}
+LOGIN_ROUTE = "/api/auth/login"
+# Revocarían el token de la repetición o necesitan datos que no se capturan
+SKIPPED_ROUTES = {"/api/auth/logout", "/api/auth/refresh", "/api/auth/register", "/api/auth/forgot-password", "/api/auth/reset-password"}
+SERVER_TIMING = re.compile(r"dur=([\d.]+)")
+STR_SHAPE = re.compile(r"^<str:(\d+)>$")
+
+def load_records(path: str, read_only: bool, limit: int):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["route"] in SKIPPED_ROUTES or (read_only and record["method"] != "GET"):
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+def materialize(shape):
+    # Inverso de utils.traffic.body_shape: textos de relleno con la misma longitud
+    if isinstance(shape, dict):
+        return {key: materialize(value) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [materialize(value) for value in shape]
+    if isinstance(shape, str):
+        match = STR_SHAPE.match(shape)
+        return "r" * max(1, int(match.group(1))) if match else "replay"
+    return shape
+
+def http(base_url: str, method: str, path: str, query=None, data: bytes = None, headers=None):
+    url = base_url.rstrip("/") + path
+    if query:
+        url += "?" + urllib.parse.urlencode([tuple(pair) for pair in query])
+    request = urllib.request.Request(url, data=data, method=method, headers=headers or {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status, server_timing = response.status, response.headers.get("Server-Timing", "")
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, server_timing = e.code, e.headers.get("Server-Timing", "")
+    except urllib.error.URLError:
+        # Sin respuesta (conexión rechazada, timeout): cuenta como status distinto
+        status, server_timing = 0, ""
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    # Se compara con el tiempo medido en el servidor, igual que en la captura
+    match = SERVER_TIMING.search(server_timing)
+    return status, float(match.group(1)) if match else elapsed_ms
+
+def login(base_url: str, role: str, credentials: str) -> str:
+    username, password = credentials.split(":", 1)
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    request = urllib.request.Request(base_url.rstrip("/") + LOGIN_ROUTE, data=data, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["access_token"]
+    except urllib.error.HTTPError as e:
+        reason = f"HTTP {e.code}"
+    except urllib.error.URLError as e:
+        reason = str(e.reason)
+    raise SystemExit(f"Login failed for role '{role}' as user '{username}' ({reason}); pass --login {role}=USER:PASSWORD")
+
+def build_request(record, tokens, logins, login_role):
+    path = record["route"]
+    for name, value in record["path_params"].items():
+        path = path.replace("{" + name + "}", urllib.parse.quote(str(value), safe=""))
+    headers = {}
+    if record["role"]:
+        if record["role"] not in tokens:
+            return None
+        headers["Authorization"] = f"Bearer {tokens[record['role']]}"
+    data = None
+    body = record["body"]
+    if record["route"] == LOGIN_ROUTE:
+        username, password = logins[login_role].split(":", 1)
+        data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    elif isinstance(body, (dict, list)):
+        data = json.dumps(materialize(body)).encode()
+        headers["Content-Type"] = "application/json"
+    return record["method"], path, record["query"], data, headers
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def delta(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+
+def report(results, min_samples: int):
+    print(f"{'route':<40} {'n':>5} {'p50 rec':>9} {'p50 now':>9} {'Δp50':>6} {'p95 rec':>9} {'p95 now':>9} {'Δp95':>6} {'status≠':>8}")
+    regressions = []
+    for route, rows in sorted(results.items(), key=lambda item: -len(item[1])):
+        recorded = [row[0] for row in rows]
+        replayed = [row[1] for row in rows]
+        mismatches = sum(1 for row in rows if row[2] != row[3])
+        rec50, now50 = percentile(recorded, 0.5), percentile(replayed, 0.5)
+        rec95, now95 = percentile(recorded, 0.95), percentile(replayed, 0.95)
+        print(
+            f"{route:<40} {len(rows):>5} {rec50:>7.1f}ms {now50:>7.1f}ms {delta(rec50, now50):>6} "
+            f"{rec95:>7.1f}ms {now95:>7.1f}ms {delta(rec95, now95):>6} {mismatches:>8}"
+        )
+        if len(rows) >= min_samples and rec95:
+            regressions.append((route, (now95 - rec95) / rec95 * 100))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare latencies per route")
+    parser.add_argument("capture_file")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up over the recorded pace; 0 sends without waiting")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--login", action="append", default=[], metavar="ROLE=USER:PASSWORD", help="Credentials used for each recorded role")
+    parser.add_argument("--login-role", default="user", help="Credentials used when replaying logins")
+    parser.add_argument("--read-only", action="store_true", help="Replay only GET requests")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--min-samples", type=int, default=5)
+    parser.add_argument("--fail-over", type=float, default=None, metavar="PCT", help="Exit 1 if a route's p95 got more than PCT%% slower")
+    args = parser.parse_args()
+
+    logins = dict(DEFAULT_LOGINS)
+    logins.update(item.split("=", 1) for item in args.login)
+    if args.login_role not in logins:
+        raise SystemExit(f"No credentials for --login-role '{args.login_role}'; pass --login {args.login_role}=USER:PASSWORD")
+    records = load_records(args.capture_file, args.read_only, args.limit)
+    if not records:
+        raise SystemExit("No requests to replay")
+    roles = {record["role"] for record in records if record["role"]}
+    tokens = {role: login(args.base_url, role, logins[role]) for role in roles if role in logins}
+
+    results = defaultdict(list)
+    skipped = 0
+    first_ts, start = records[0]["ts"], time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        pending = []
+        for record in records:
+            request = build_request(record, tokens, logins, args.login_role)
+            if request is None:
+                skipped += 1
+                continue
+            if args.speed > 0:
+                wait = (record["ts"] - first_ts) / args.speed - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+            pending.append((record, pool.submit(http, args.base_url, *request)))
+        for record, future in pending:
+            status, ms = future.result()
+            results[f"{record['method']} {record['route']}"].append((record["ms"], ms, record["status"], status))
+
+    total = sum(len(rows) for rows in results.values())
+    print(f"Replayed {total} requests in {time.monotonic() - start:.1f}s ({skipped} skipped, roles without credentials)")
+    regressions = report(results, args.min_samples)
+    if args.fail_over is not None:
+        failed = [(route, pct) for route, pct in regressions if pct > args.fail_over]
+        for route, pct in failed:
+            print(f"REGRESSION {route}: p95 {pct:+.0f}%")
+        if failed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+import argparse
+import csv
+import io
+import logging
+import random
+import time
 from datetime import datetime, timedelta
 from db.database import create_db_and_tables, get_session
 from models.user import User, UserRole
@@ -5,18 +11,31 @@ from models.todo_list import TodoList
 from models.task import Task
 from models.task_status import TaskStatus, TaskStatusEnum
 from auth.jwt_auth import get_password_hash
-from sqlalchemy import text
+from utils.cache import invalidate
+from sqlalchemy import insert, text
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "revisar enviar preparar llamar actualizar corregir diseñar probar documentar publicar "
+    "reunión informe cliente factura despliegue servidor base datos equipo tarea proyecto "
+    "urgente semanal pendiente nuevo final borrador presupuesto entrega soporte análisis"
+).split()
+GENERATED_PASSWORD = "benchpass"
+
+def clear_data(session):
+    # Borrar en orden: task -> todolist -> taskstatus -> user
+    session.exec(text("DELETE FROM task"))
+    session.exec(text("DELETE FROM todolist"))
+    session.exec(text("DELETE FROM taskstatus"))
+    session.exec(text('DELETE FROM "user"'))
+    session.commit()
 
 def seed_data():
     create_db_and_tables()  # Crear las tablas si no existen
 
     with next(get_session()) as session:
-        # Borrar en orden: task -> todolist -> taskstatus -> user
-        session.exec(text("DELETE FROM task"))
-        session.exec(text("DELETE FROM todolist"))
-        session.exec(text("DELETE FROM taskstatus"))
-        session.exec(text('DELETE FROM "user"'))
-        session.commit()
+        clear_data(session)
 
         # Crear estados de tareas
         pending_status = TaskStatus(name=TaskStatusEnum.PENDING, color="yellow")
@@ -75,5 +94,170 @@ def seed_data():
         session.add_all([task1, task2])
         session.commit()
 
+def parse_status_weights(value: str):
+    weights = {}
+    for item in value.split(","):
+        name, weight = item.rsplit("=", 1)
+        weights[TaskStatusEnum(name.strip())] = float(weight)
+    return weights
+
+def random_text(rng: random.Random, length: int):
+    words = []
+    size = -1
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+def batched(rows, batch_size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def copy_rows(session, table: str, columns, rows):
+    # COPY de Postgres: un solo round trip por lote, sin parsear INSERTs
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+def bulk_insert(session, model, rows, batch_size: int, use_copy: bool):
+    table = model.__table__
+    count = 0
+    for batch in batched(rows, batch_size):
+        if use_copy:
+            copy_rows(session, f'"{table.name}"', list(batch[0].keys()), batch)
+        else:
+            session.execute(insert(model), batch)
+        session.commit()
+        count += len(batch)
+    logger.info(f"Inserted {count} rows into {table.name}")
+    return count
+
+def generate_data(
+    users: int,
+    lists_per_user: int,
+    tasks_per_list: int,
+    status_weights,
+    due_spread_days: int,
+    text_length: int,
+    seed: int,
+    base_date: datetime,
+    batch_size: int = 10000,
+    use_copy: bool = False
+):
+    create_db_and_tables()
+    rng = random.Random(seed)
+    # Un único hash para todos: bcrypt es lento a propósito
+    hashed_password = get_password_hash(GENERATED_PASSWORD)
+
+    with next(get_session()) as session:
+        use_copy = use_copy and session.bind.dialect.name == "postgresql"
+        clear_data(session)
+
+        statuses = list(TaskStatusEnum)
+        status_ids = {status: index + 1 for index, status in enumerate(statuses)}
+        session.execute(insert(TaskStatus), [
+            {"id": status_ids[status], "name": status, "color": color}
+            for status, color in zip(statuses, ("yellow", "blue", "green"))
+        ])
+        session.commit()
+        weighted_statuses = list(status_weights)
+        weights = [status_weights[status] for status in weighted_statuses]
+
+        def user_rows():
+            for user_id in range(1, users + 1):
+                role = UserRole.admin if user_id == 1 else UserRole.user
+                yield {
+                    "id": user_id,
+                    "username": f"user{user_id}",
+                    "email": f"user{user_id}@example.com",
+                    "hashed_password": hashed_password,
+                    "created_at": base_date - timedelta(days=rng.randint(0, 365)),
+                    # Con COPY el enum se guarda por nombre, como hace SQLAlchemy
+                    "role": role.name if use_copy else role,
+                }
+
+        def list_rows():
+            for list_id in range(1, users * lists_per_user + 1):
+                yield {
+                    "id": list_id,
+                    "title": random_text(rng, min(text_length, 40)),
+                    "description": random_text(rng, text_length),
+                    "owner_id": (list_id - 1) // lists_per_user + 1,
+                    "created_at": base_date - timedelta(days=rng.randint(0, 365)),
+                }
+
+        def task_rows():
+            task_id = 0
+            for list_id in range(1, users * lists_per_user + 1):
+                for _ in range(tasks_per_list):
+                    task_id += 1
+                    status = rng.choices(weighted_statuses, weights)[0]
+                    yield {
+                        "id": task_id,
+                        "title": random_text(rng, min(text_length, 60)),
+                        "description": random_text(rng, text_length),
+                        "due_date": base_date + timedelta(minutes=rng.randint(-due_spread_days, due_spread_days) * 24 * 60 + rng.randint(0, 1439)),
+                        "is_completed": status == TaskStatusEnum.COMPLETED,
+                        "todo_list_id": list_id,
+                        "status_id": status_ids[status],
+                        "created_at": base_date - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+                    }
+
+        start = time.perf_counter()
+        bulk_insert(session, User, user_rows(), batch_size, use_copy)
+        bulk_insert(session, TodoList, list_rows(), batch_size, use_copy)
+        bulk_insert(session, Task, task_rows(), batch_size, use_copy)
+        if session.bind.dialect.name == "postgresql":
+            # Los ids se asignaron a mano: las secuencias deben continuar desde el máximo
+            for table in ("taskstatus", "user", "todolist", "task"):
+                session.exec(text(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), COALESCE((SELECT MAX(id) FROM \"{table}\"), 1))"))
+            session.commit()
+        logger.info(f"Generated dataset in {time.perf_counter() - start:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed demo data, or generate a synthetic dataset with --users")
+    parser.add_argument("--users", type=int, help="Generate this many users instead of the demo data")
+    parser.add_argument("--lists-per-user", type=int, default=5)
+    parser.add_argument("--tasks-per-list", type=int, default=20)
+    parser.add_argument("--status-weights", type=parse_status_weights, default="pendiente=0.5,en progreso=0.2,completada=0.3",
+                        help="Comma separated status=weight pairs")
+    parser.add_argument("--due-spread-days", type=int, default=60, help="Due dates fall within +/- this many days of --base-date")
+    parser.add_argument("--text-length", type=int, default=80, help="Length of generated descriptions")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-date", type=datetime.fromisoformat, default=datetime(2026, 1, 1))
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--copy", action="store_true", help="Use Postgres COPY instead of batched INSERTs")
+    args = parser.parse_args()
+    if args.users is None:
+        seed_data()
+        # Los datos cambian fuera de la API: las lecturas cacheadas dejan de valer
+        invalidate("users", "tasks:bulk", "statuses")
+        return
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    generate_data(
+        users=args.users,
+        lists_per_user=args.lists_per_user,
+        tasks_per_list=args.tasks_per_list,
+        status_weights=args.status_weights,
+        due_spread_days=args.due_spread_days,
+        text_length=args.text_length,
+        seed=args.seed,
+        base_date=args.base_date,
+        batch_size=args.batch_size,
+        use_copy=args.copy
+    )
+    invalidate("users", "tasks:bulk", "statuses")
+
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable
+from fastapi import Request, Response
+from redis.exceptions import RedisError
+from sqlmodel import Session
+from auth.jwt_auth import get_redis
+from db.database import get_engine, primary_session
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+# Mientras un worker recalcula, los demás esperan como mucho esto antes de ir a la DB
+CACHE_WAIT_SECONDS = float(os.getenv("CACHE_WAIT_SECONDS", "2"))
+CACHE_LOCK_SECONDS = int(os.getenv("CACHE_LOCK_SECONDS", "10"))
+POLL_SECONDS = 0.02
+STATS_KEY = "cache:stats"
+
+def _tag_key(tag: str) -> str:
+    return f"tagv:{tag}"
+
+def _cache_key(client, namespace: str, path: str, params: str, scope: str, tags: Iterable[str]) -> str:
+    # La versión de cada tag forma parte de la clave: invalidar es INCR, sin borrar claves
+    tags = sorted(set(tags))
+    versions = client.mget([_tag_key(tag) for tag in tags]) if tags else []
+    tagged = ",".join(f"{tag}={int(version or 0)}" for tag, version in zip(tags, versions))
+    digest = hashlib.sha256(f"{path}?{params}|{scope}|{tagged}".encode()).hexdigest()
+    return f"cache:{namespace}:{digest}"
+
+def _request_params(request: Request) -> str:
+    # Se ordena solo por nombre (sort estable): el orden de los valores repetidos (?ids=2&ids=1) cambia la respuesta
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items(), key=lambda item: item[0]))
+
+def _count(client, namespace: str, event: str):
+    client.hincrby(STATS_KEY, f"{namespace}:{event}", 1)
+
+def _json(content: bytes, cache_status: str) -> Response:
+    return Response(content=content, media_type="application/json", headers={"X-Cache": cache_status})
+
+def cached_response(
+    namespace: str, request: Request, scope: str, tags: Iterable[str], session: Session, build: Callable[[Session], bytes]
+) -> Response:
+    # build(session) devuelve el JSON ya serializado; solo se llama si no está en caché.
+    # Lo que se guarda lo leen todos los usuarios: se construye en el primario, nunca en una réplica con retraso
+    # (si no, tras invalidar se guardarían datos viejos con la versión nueva del tag)
+    if not CACHE_ENABLED:
+        return _json(build(session), "bypass")
+    try:
+        client = get_redis()
+        key = _cache_key(client, namespace, request.url.path, _request_params(request), scope, tags)
+        cached = client.get(key)
+        if cached is not None:
+            _count(client, namespace, "hits")
+            return _json(cached, "hit")
+        lock_key = f"{key}:lock"
+        if not client.set(lock_key, 1, nx=True, ex=CACHE_LOCK_SECONDS):
+            # Otro worker ya está recalculando esta misma página
+            deadline = time.monotonic() + CACHE_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(POLL_SECONDS)
+                cached = client.get(key)
+                if cached is not None:
+                    _count(client, namespace, "waits")
+                    return _json(cached, "hit")
+            lock_key = None
+    except RedisError as e:
+        logger.warning(f"Cache unavailable, reading from database - {e}")
+        return _json(build(session), "bypass")
+
+    try:
+        with primary_session(session) as primary:
+            content = build(primary)
+        _count(client, namespace, "misses")
+        client.set(key, content, ex=CACHE_TTL_SECONDS)
+    except RedisError as e:
+        logger.warning(f"Could not store cache entry - {e}")
+    finally:
+        if lock_key:
+            try:
+                client.delete(lock_key)
+            except RedisError:
+                pass
+    return _json(content, "miss")
+
+def prime(namespace: str, path: str, scope: str, tags: Iterable[str], build: Callable[[Session], bytes]):
+    # Warm-up: deja guardada la entrada que serviría GET path sin parámetros
+    if not CACHE_ENABLED:
+        return
+    client = get_redis()
+    with Session(get_engine()) as session:
+        client.set(_cache_key(client, namespace, path, "", scope, tags), build(session), ex=CACHE_TTL_SECONDS)
+
+def invalidate(*tags: str):
+    # Las entradas con la versión anterior del tag dejan de usarse y expiran por TTL
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(_tag_key(tag))
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not invalidate cache tags {', '.join(tags)} - {e}")
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    raw = get_redis().hgetall(STATS_KEY)
+    stats: Dict[str, Dict[str, float]] = {}
+    for field, value in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        namespace, event = field.rsplit(":", 1)
+        stats.setdefault(namespace, {"hits": 0, "misses": 0, "waits": 0})[event] = int(value)
+    for counters in stats.values():
+        served = counters["hits"] + counters["waits"]
+        total = served + counters["misses"]
+        counters["hit_rate"] = round(served / total, 4) if total else 0.0
+    return stats
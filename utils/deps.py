@@ -1,20 +1,36 @@
 from fastapi import Depends, HTTPException, status
 from models.user import User, UserRole
-from db.database import get_session
+from db.database import get_engine, get_read_session, get_session
 from sqlmodel import Session, select
 from auth.jwt_auth import decode_access_token, oauth2_scheme
+from crud.user import get_user_by_username
 
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = session.exec(select(User).where(User.username == payload["sub"])).first()
+    user = get_user_by_username(session, payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
-def require_role(*roles):
-    def role_checker(current_user: User = Depends(get_current_user)):
+def get_read_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_read_session)):
+    # Misma sesión que el endpoint de lectura: réplica si hay, sin abrir además una conexión al primario
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user = get_user_by_username(session, payload["sub"])
+    if not user and session.get_bind() is not get_engine():
+        # Usuario recién creado que la réplica aún no tiene
+        with Session(get_engine()) as primary:
+            user = get_user_by_username(primary, payload["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+def require_role(*roles, read_only: bool = False):
+    # read_only=True en endpoints que leen con get_read_session
+    def role_checker(current_user: User = Depends(get_read_current_user if read_only else get_current_user)):
         if current_user.role not in roles:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return current_user
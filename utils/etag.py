@@ -0,0 +1,20 @@
+from typing import Optional
+from fastapi import HTTPException, Response
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+def set_etag(response: Response, version: int):
+    response.headers["ETag"] = etag(version)
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    # None o "*": sin control de concurrencia
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="If-Match does not match the current version")
@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter, create_model
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields cannot be empty")
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+@lru_cache(maxsize=256)
+def partial_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    # Un modelo recortado por combinación de campos, reutilizado entre requests
+    definitions = {name: (schema.model_fields[name].annotation, ...) for name in fields}
+    partial = create_model(f"{schema.__name__}Partial", **definitions)
+    return TypeAdapter(List[partial])
+
+def fields_json(schema: Type[BaseModel], fields: Tuple[str, ...], rows) -> bytes:
+    adapter = partial_schema(schema, fields)
+    return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+
+def fields_response(schema: Type[BaseModel], fields: Tuple[str, ...], rows) -> Response:
+    return Response(content=fields_json(schema, fields, rows), media_type="application/json")
@@ -0,0 +1,86 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from anyio import to_thread
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from auth.jwt_auth import get_redis, get_request_subject, is_token_revoked
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Un duplicado concurrente espera como mucho esto a que termine el original
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+def _replay(stored: dict) -> Response:
+    response = Response(content=base64.b64decode(stored["body"]), status_code=stored["status"])
+    response.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored["headers"]]
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def _load(redis_key: str):
+    raw = get_redis().get(redis_key)
+    return json.loads(raw) if raw else None
+
+async def idempotent_request(request: Request, call_next):
+    key = request.headers.get("idempotency-key")
+    # Solo POST autenticados: el alcance de la clave es el usuario
+    subject = get_request_subject(request) if key and request.method == "POST" else None
+    if subject is None:
+        return await call_next(request)
+    # get_request_subject no mira la revocación: con un token revocado no se reproduce nada, el endpoint responde 401
+    if await to_thread.run_sync(is_token_revoked, request.headers["authorization"][7:]):
+        return await call_next(request)
+    if len(key) > MAX_KEY_LENGTH:
+        return JSONResponse(status_code=400, content={"detail": "Idempotency-Key is too long"})
+
+    body = await request.body()
+    fingerprint = hashlib.sha256(
+        request.method.encode() + b" " + request.url.path.encode() + b"?" + request.url.query.encode() + b"\n" + body
+    ).hexdigest()
+    redis_key = f"idempotency:{subject}:{key}"
+    lock_key = f"{redis_key}:lock"
+
+    def check(stored):
+        if stored["fingerprint"] != fingerprint:
+            return JSONResponse(status_code=422, content={"detail": "Idempotency-Key was already used with a different request"})
+        return _replay(stored)
+
+    stored = await to_thread.run_sync(_load, redis_key)
+    if stored:
+        return check(stored)
+
+    acquired = await to_thread.run_sync(lambda: get_redis().set(lock_key, fingerprint, nx=True, ex=IDEMPOTENCY_LOCK_SECONDS))
+    if not acquired:
+        # Otra request con la misma clave está en curso: esperar su respuesta
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_SECONDS)
+            stored = await to_thread.run_sync(_load, redis_key)
+            if stored:
+                return check(stored)
+        return JSONResponse(status_code=409, content={"detail": "A request with this Idempotency-Key is still in progress"})
+
+    try:
+        response = await call_next(request)
+        content = b"".join([chunk async for chunk in response.body_iterator])
+        headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in response.raw_headers]
+        # Solo se guardan los 2xx: un 4xx/5xx puede venir de un estado pasajero (permisos, conflicto, caída)
+        # y el reintento debe volver a ejecutarse
+        if 200 <= response.status_code < 300:
+            stored = {
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "headers": headers,
+                "body": base64.b64encode(content).decode(),
+            }
+            await to_thread.run_sync(lambda: get_redis().set(redis_key, json.dumps(stored), ex=IDEMPOTENCY_TTL_SECONDS))
+        replayable = Response(content=content, status_code=response.status_code, background=response.background)
+        replayable.raw_headers = response.raw_headers
+        return replayable
+    finally:
+        await to_thread.run_sync(lambda: get_redis().delete(lock_key))
@@ -0,0 +1,347 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from redis.exceptions import ResponseError
+
+# Sustituto en proceso de Redis para APP_BACKEND=local: implementa solo las operaciones que usa la app,
+# con la misma semántica que redis-py sin decode_responses (devuelve bytes)
+SWEEP_INTERVAL_SECONDS = 1.0
+
+# Comandos públicos (utils/profiling.py los instrumenta igual que redis.Redis.execute_command)
+COMMANDS = (
+    "ping", "get", "mget", "set", "setex", "incr", "decr", "exists", "delete", "expire", "ttl",
+    "hincrby", "hgetall", "rpush", "lpop", "blpop", "blmove", "lrange", "lrem", "llen",
+    "zadd", "zscore", "zcard", "zrangebyscore", "zremrangebyscore", "zrem", "flushdb",
+)
+
+WRONG_TYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+def _score(value) -> float:
+    # Acepta números y también "-inf" / "+inf"
+    return float(value.decode() if isinstance(value, bytes) else value)
+
+class _Hash(dict):
+    pass
+
+class _SortedSet(dict):
+    pass
+
+class _LocalPool:
+    def reset(self):
+        # No hay conexiones que reabrir tras un fork
+        pass
+
+class LocalPipeline:
+    def __init__(self, client: "LocalRedis"):
+        self.client = client
+        self.command_stack = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.command_stack.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        # Todos los comandos bajo el mismo lock: nadie ve un estado intermedio
+        with self.client.condition:
+            try:
+                return [method(*args, **kwargs) for method, args, kwargs in self.command_stack]
+            finally:
+                self.command_stack = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.command_stack = []
+
+class LocalRedis:
+    def __init__(self):
+        self.data: Dict[bytes, object] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.condition = threading.Condition(threading.RLock())
+        self.connection_pool = _LocalPool()
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+
+    def _expired(self, key: bytes, now: float) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= now:
+            self.data.pop(key, None)
+            del self.expires[key]
+            return True
+        return False
+
+    def _sweep(self):
+        # Las claves con TTL que nadie vuelve a leer (caché, tokens revocados) también se liberan
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + SWEEP_INTERVAL_SECONDS
+        for key in [key for key, deadline in self.expires.items() if deadline <= now]:
+            self._expired(key, now)
+
+    def _lookup(self, key, kind: type, create: bool = False):
+        key = _encode(key)
+        self._expired(key, time.monotonic())
+        value = self.data.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = self.data[key] = kind()
+        elif not isinstance(value, kind):
+            raise ResponseError(WRONG_TYPE)
+        return value
+
+    def _store(self, key: bytes, value, ex: Optional[float]):
+        self.data[key] = value
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+        else:
+            self.expires.pop(key, None)
+
+    def _drop_if_empty(self, key):
+        key = _encode(key)
+        if not self.data.get(key):
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    def flushdb(self) -> bool:
+        with self.condition:
+            self.data.clear()
+            self.expires.clear()
+        return True
+
+    def pipeline(self, transaction: bool = True) -> LocalPipeline:
+        return LocalPipeline(self)
+
+    # Strings y contadores
+
+    def get(self, name) -> Optional[bytes]:
+        with self.condition:
+            return self._lookup(name, bytes)
+
+    def mget(self, keys, *args):
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        with self.condition:
+            return [self.get(key) for key in keys + list(args)]
+
+    def set(self, name, value, ex=None, px=None, nx: bool = False, xx: bool = False):
+        key = _encode(name)
+        if px is not None:
+            ex = px / 1000
+        with self.condition:
+            self._sweep()
+            exists = not self._expired(key, time.monotonic()) and key in self.data
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._store(key, _encode(value), ex)
+            return True
+
+    def setex(self, name, time_seconds, value) -> bool:
+        return self.set(name, value, ex=time_seconds)
+
+    def incr(self, name, amount: int = 1) -> int:
+        key = _encode(name)
+        with self.condition:
+            current = self._lookup(key, bytes)
+            try:
+                value = int(current or 0) + amount
+            except ValueError:
+                raise ResponseError("value is not an integer or out of range")
+            # Como en Redis, INCR conserva el TTL de la clave
+            self.data[key] = str(value).encode()
+            return value
+
+    def decr(self, name, amount: int = 1) -> int:
+        return self.incr(name, -amount)
+
+    # Claves
+
+    def exists(self, *names) -> int:
+        with self.condition:
+            now = time.monotonic()
+            keys = [_encode(name) for name in names]
+            return sum(1 for key in keys if not self._expired(key, now) and key in self.data)
+
+    def delete(self, *names) -> int:
+        with self.condition:
+            deleted = 0
+            for name in names:
+                key = _encode(name)
+                if not self._expired(key, time.monotonic()) and self.data.pop(key, None) is not None:
+                    deleted += 1
+                self.expires.pop(key, None)
+            return deleted
+
+    def expire(self, name, time_seconds) -> bool:
+        key = _encode(name)
+        with self.condition:
+            if self._expired(key, time.monotonic()) or key not in self.data:
+                return False
+            self.expires[key] = time.monotonic() + time_seconds
+            return True
+
+    def ttl(self, name) -> int:
+        key = _encode(name)
+        with self.condition:
+            if self._expired(key, time.monotonic()) or key not in self.data:
+                return -2
+            deadline = self.expires.get(key)
+            return -1 if deadline is None else max(0, round(deadline - time.monotonic()))
+
+    # Hashes
+
+    def hincrby(self, name, key, amount: int = 1) -> int:
+        with self.condition:
+            values = self._lookup(name, _Hash, create=True)
+            field = _encode(key)
+            value = int(values.get(field, 0)) + amount
+            values[field] = str(value).encode()
+            return value
+
+    def hgetall(self, name) -> Dict[bytes, bytes]:
+        with self.condition:
+            return dict(self._lookup(name, _Hash) or {})
+
+    # Listas (cola de jobs)
+
+    def rpush(self, name, *values) -> int:
+        with self.condition:
+            items = self._lookup(name, deque, create=True)
+            items.extend(_encode(value) for value in values)
+            self.condition.notify_all()
+            return len(items)
+
+    def lpop(self, name) -> Optional[bytes]:
+        with self.condition:
+            items = self._lookup(name, deque)
+            if not items:
+                return None
+            value = items.popleft()
+            self._drop_if_empty(name)
+            return value
+
+    def blpop(self, keys, timeout: float = 0):
+        # timeout=0 espera indefinidamente, como en Redis
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        deadline = time.monotonic() + timeout if timeout else None
+        with self.condition:
+            while True:
+                for key in keys:
+                    value = self.lpop(key)
+                    if value is not None:
+                        return _encode(key), value
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def blmove(self, first_list, second_list, timeout: float, src: str = "LEFT", dest: str = "RIGHT") -> Optional[bytes]:
+        deadline = time.monotonic() + timeout if timeout else None
+        with self.condition:
+            while True:
+                items = self._lookup(first_list, deque)
+                if items:
+                    value = items.popleft() if src == "LEFT" else items.pop()
+                    self._drop_if_empty(first_list)
+                    target = self._lookup(second_list, deque, create=True)
+                    target.append(value) if dest == "RIGHT" else target.appendleft(value)
+                    return value
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def lrange(self, name, start: int, end: int):
+        with self.condition:
+            items = list(self._lookup(name, deque) or ())
+            return items[start:None if end == -1 else end + 1]
+
+    def lrem(self, name, count: int, value) -> int:
+        # Solo count >= 0 (desde la izquierda), el único uso en la app
+        value = _encode(value)
+        with self.condition:
+            items = self._lookup(name, deque)
+            if not items:
+                return 0
+            kept, removed = deque(), 0
+            for item in items:
+                if item == value and (count == 0 or removed < count):
+                    removed += 1
+                else:
+                    kept.append(item)
+            self.data[_encode(name)] = kept
+            self._drop_if_empty(name)
+            return removed
+
+    def llen(self, name) -> int:
+        with self.condition:
+            return len(self._lookup(name, deque) or ())
+
+    # Sorted sets (reintentos con backoff)
+
+    def zadd(self, name, mapping: dict, nx: bool = False, xx: bool = False) -> int:
+        with self.condition:
+            members = self._lookup(name, _SortedSet, create=True)
+            added = 0
+            for member, score in mapping.items():
+                member = _encode(member)
+                exists = member in members
+                if (nx and exists) or (xx and not exists):
+                    continue
+                added += not exists
+                members[member] = float(score)
+            self._drop_if_empty(name)
+            return added
+
+    def zscore(self, name, value) -> Optional[float]:
+        with self.condition:
+            return (self._lookup(name, _SortedSet) or {}).get(_encode(value))
+
+    def zcard(self, name) -> int:
+        with self.condition:
+            return len(self._lookup(name, _SortedSet) or ())
+
+    def zrangebyscore(self, name, min, max):
+        low, high = _score(min), _score(max)
+        with self.condition:
+            members = self._lookup(name, _SortedSet) or {}
+            return [member for member, score in sorted(members.items(), key=lambda item: (item[1], item[0])) if low <= score <= high]
+
+    def zremrangebyscore(self, name, min, max) -> int:
+        with self.condition:
+            members = self._lookup(name, _SortedSet)
+            if not members:
+                return 0
+            low, high = _score(min), _score(max)
+            expired = [member for member, score in members.items() if low <= score <= high]
+            for member in expired:
+                del members[member]
+            self._drop_if_empty(name)
+            return len(expired)
+
+    def zrem(self, name, *values) -> int:
+        with self.condition:
+            members = self._lookup(name, _SortedSet)
+            if not members:
+                return 0
+            removed = sum(1 for value in values if members.pop(_encode(value), None) is not None)
+            self._drop_if_empty(name)
+            return removed
@@ -0,0 +1,251 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+import redis
+from anyio import to_thread
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from auth.jwt_auth import get_redis, is_token_revoked
+from db.database import get_engine
+from models.user import UserRole
+from utils.deps import get_current_user, require_role
+from utils.local_redis import COMMANDS as LOCAL_REDIS_COMMANDS, LocalPipeline, LocalRedis
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "1")) / 1000
+PROFILE_TTL_SECONDS = int(os.getenv("PROFILE_TTL_SECONDS", "3600"))
+MAX_STATEMENT_LENGTH = 2000
+
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("current_profile", default=None)
+_in_local_redis: contextvars.ContextVar[bool] = contextvars.ContextVar("in_local_redis", default=False)
+_HANDLE_RUN_CODE = asyncio.Handle._run.__code__
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, username: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.username = username
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.samples = 0
+        self.timeline = []
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, detail: str, start: float, end: float):
+        with self.lock:
+            self.timeline.append({
+                "type": kind,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "thread": threading.current_thread().name,
+                "detail": detail[:MAX_STATEMENT_LENGTH],
+            })
+
+    def folded(self) -> str:
+        # Formato "a;b;c N": flamegraph.pl, speedscope, inferno...
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def to_dict(self, status_code: int, duration_ms: float) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "username": self.username,
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "interval_ms": PROFILE_INTERVAL_SECONDS * 1000,
+            "samples": self.samples,
+            "timeline": sorted(self.timeline, key=lambda item: item["start_ms"]),
+            "folded": self.folded(),
+        }
+
+def _frame_context(frame):
+    # El Context de la request está en el frame que la ejecuta:
+    # context.run(...) en los hilos de anyio y Handle._run en el event loop
+    while frame is not None:
+        code = frame.f_code
+        if code is _HANDLE_RUN_CODE:
+            return frame.f_locals["self"]._context
+        if "context" in code.co_varnames:
+            context = frame.f_locals.get("context")
+            if isinstance(context, contextvars.Context):
+                return context
+        frame = frame.f_back
+    return None
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname solo existe desde Python 3.11
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def _sample(profile: RequestProfile, stop: threading.Event):
+    # Solo cuentan los hilos que en ese momento trabajan para esta request
+    own_id = threading.get_ident()
+    while not stop.wait(PROFILE_INTERVAL_SECONDS):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            context = _frame_context(frame)
+            if context is not None and context.get(_current_profile) is profile:
+                profile.stacks[_fold(frame)] += 1
+                profile.samples += 1
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None and conn.info.get("profile_start"):
+        profile.record("sql", statement, conn.info["profile_start"].pop(), time.perf_counter())
+
+_original_execute_command = redis.Redis.execute_command
+_original_pipeline_execute = redis.client.Pipeline.execute
+
+def _traced_execute_command(self, *args, **options):
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_execute_command(self, *args, **options)
+    start = time.perf_counter()
+    try:
+        return _original_execute_command(self, *args, **options)
+    finally:
+        profile.record("redis", " ".join(str(arg) for arg in args[:2]), start, time.perf_counter())
+
+def _traced_pipeline_execute(self, *args, **kwargs):
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_pipeline_execute(self, *args, **kwargs)
+    commands = len(self.command_stack)
+    start = time.perf_counter()
+    try:
+        return _original_pipeline_execute(self, *args, **kwargs)
+    finally:
+        profile.record("redis", f"PIPELINE ({commands} commands)", start, time.perf_counter())
+
+_original_local_commands = {name: getattr(LocalRedis, name) for name in LOCAL_REDIS_COMMANDS}
+_original_local_pipeline_execute = LocalPipeline.execute
+
+def _traced_local(detail, original):
+    # APP_BACKEND=local: solo se registra la llamada externa (mget llama a get, el pipeline a cada comando...)
+    def traced(self, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None or _in_local_redis.get():
+            return original(self, *args, **kwargs)
+        token = _in_local_redis.set(True)
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _in_local_redis.reset(token)
+            profile.record("redis", detail(self, args), start, time.perf_counter())
+    return traced
+
+def _local_command_detail(name):
+    return lambda client, args: " ".join([name.upper()] + [str(arg) for arg in args[:1]])
+
+_traced_local_commands = {
+    name: _traced_local(_local_command_detail(name), original) for name, original in _original_local_commands.items()
+}
+_traced_local_pipeline_execute = _traced_local(
+    lambda pipeline, args: f"PIPELINE ({len(pipeline.command_stack)} commands)", _original_local_pipeline_execute
+)
+
+_hooks_lock = threading.Lock()
+_active_profiles = 0
+
+def _install_hooks():
+    # Los hooks solo existen mientras hay alguna request perfilada
+    global _active_profiles
+    with _hooks_lock:
+        _active_profiles += 1
+        if _active_profiles == 1:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            redis.Redis.execute_command = _traced_execute_command
+            redis.client.Pipeline.execute = _traced_pipeline_execute
+            for name, traced in _traced_local_commands.items():
+                setattr(LocalRedis, name, traced)
+            LocalPipeline.execute = _traced_local_pipeline_execute
+
+def _remove_hooks():
+    global _active_profiles
+    with _hooks_lock:
+        _active_profiles -= 1
+        if _active_profiles == 0:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+            redis.Redis.execute_command = _original_execute_command
+            redis.client.Pipeline.execute = _original_pipeline_execute
+            for name, original in _original_local_commands.items():
+                setattr(LocalRedis, name, original)
+            LocalPipeline.execute = _original_local_pipeline_execute
+
+def _authorize(request: Request):
+    # Mismas reglas que los endpoints: token válido, no revocado y rol admin
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    token = authorization[7:]
+    if is_token_revoked(token):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    with Session(get_engine()) as session:
+        user = require_role(UserRole.admin)(get_current_user(token, session))
+        return user.username
+
+def save_profile(data: dict):
+    get_redis().set(f"profile:{data['id']}", json.dumps(data), ex=PROFILE_TTL_SECONDS)
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    raw = get_redis().get(f"profile:{profile_id}")
+    return json.loads(raw) if raw else None
+
+async def profile_request(request: Request, call_next):
+    # Sin cabecera X-Profile la request no pasa por nada de esto
+    if "x-profile" not in request.headers:
+        return await call_next(request)
+    try:
+        username = await to_thread.run_sync(_authorize, request)
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+    profile = RequestProfile(request.method, request.url.path, username)
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample, args=(profile, stop), name=f"profiler-{profile.id[:8]}", daemon=True)
+    _install_hooks()
+    token = _current_profile.set(profile)
+    sampler.start()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        duration_ms = (time.perf_counter() - profile.started) * 1000
+        stop.set()
+        sampler.join()
+        _current_profile.reset(token)
+        _remove_hooks()
+        try:
+            await to_thread.run_sync(save_profile, profile.to_dict(status_code, duration_ms))
+        except redis.RedisError as e:
+            logger.warning(f"Could not store profile {profile.id} - {e}")
+    logger.info(f"Request profiled: {request.method} {request.url.path} ({profile.samples} samples, id {profile.id})")
+    response.headers["X-Profile-Id"] = profile.id
+    return response
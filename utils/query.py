@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, bindparam, not_, or_
+
+# Sentencias ya construidas que se guardan, una por forma de consulta
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "512"))
+
+# Un filtro recibe las columnas disponibles (por nombre) y el valor del query param,
+# normalmente un bindparam con el nombre del filtro
+FilterFn = Callable[[Any, Any], Any]
+
+def eq(column: str) -> FilterFn:
+    return lambda columns, value: columns[column] == value
+
+def lt(column: str) -> FilterFn:
+    return lambda columns, value: columns[column] < value
+
+def gt(column: str) -> FilterFn:
+    return lambda columns, value: columns[column] > value
+
+def overdue(due_column: str, completed_column: str) -> FilterFn:
+    def build(columns, value):
+        # La hora se calcula al ejecutar, así la sentencia se puede reutilizar
+        now = bindparam("now", callable_=datetime.utcnow, type_=DateTime)
+        # not_(col) se compila igual que el predicado de los índices parciales (NOT col / col = 0)
+        is_overdue = and_(columns[due_column] < now, not_(columns[completed_column]))
+        if value:
+            return is_overdue
+        return or_(columns[due_column].is_(None), columns[due_column] >= now, columns[completed_column])
+    # true/false cambian la forma de la consulta: el valor va literal, no como parámetro
+    build.shape = True
+    return build
+
+def _is_shape(fn: FilterFn) -> bool:
+    return getattr(fn, "shape", False)
+
+def filter_shape(filters: Dict[str, FilterFn], values: Dict[str, Any]) -> tuple:
+    # Qué filtros están activos (y el valor de los que cambian la forma): parte de la clave de la sentencia
+    return tuple(
+        (name, value if _is_shape(filters[name]) else None)
+        for name, value in values.items() if value is not None
+    )
+
+def filter_params(filters: Dict[str, FilterFn], values: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in values.items() if value is not None and not _is_shape(filters[name])}
+
+def apply_filters(query, columns, filters: Dict[str, FilterFn], values: Dict[str, Any]):
+    # Los valores van como bindparam(nombre); se pasan al ejecutar con filter_params()
+    for name, value in values.items():
+        if value is not None:
+            fn = filters[name]
+            query = query.where(fn(columns, value if _is_shape(fn) else bindparam(name)))
+    return query
+
+def parse_sort(sort: Optional[str], columns, allowed: Iterable[str], default: str = "id", tiebreaker: str = "id"):
+    # "due_date,-created_at" -> ORDER BY due_date ASC, created_at DESC, id ASC
+    keys = [key.strip() for key in (sort or default).split(",") if key.strip()]
+    allowed = set(allowed)
+    order_by = []
+    seen = set()
+    for key in keys:
+        name = key.lstrip("-+")
+        if name not in allowed:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by: {name}. Allowed: {', '.join(sorted(allowed))}")
+        if name in seen:
+            continue
+        seen.add(name)
+        order_by.append(columns[name].desc() if key.startswith("-") else columns[name].asc())
+    # Orden total para que skip/limit sea estable entre páginas
+    if tiebreaker not in seen:
+        order_by.append(columns[tiebreaker].asc())
+    return order_by
+
+_statements: "OrderedDict[Hashable, Any]" = OrderedDict()
+_statements_lock = threading.Lock()
+_statement_stats = {"hits": 0, "misses": 0}
+
+def cached_statement(key: Hashable, build: Callable[[], Any]):
+    # Misma forma de consulta -> mismo objeto select: sin reconstruir la cadena
+    # ni recalcular la clave de caché de SQLAlchemy en cada request
+    with _statements_lock:
+        statement = _statements.get(key)
+        if statement is not None:
+            _statements.move_to_end(key)
+            _statement_stats["hits"] += 1
+            return statement
+        _statement_stats["misses"] += 1
+    statement = build()
+    with _statements_lock:
+        _statements[key] = statement
+        while len(_statements) > STATEMENT_CACHE_SIZE:
+            _statements.popitem(last=False)
+    return statement
+
+def clear_statement_cache():
+    with _statements_lock:
+        _statements.clear()
+
+def statement_cache_stats() -> Dict[str, int]:
+    with _statements_lock:
+        return {"size": len(_statements), "capacity": STATEMENT_CACHE_SIZE, **_statement_stats}
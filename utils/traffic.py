@@ -0,0 +1,86 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Optional
+from fastapi import Request
+from sqlmodel import Session, select
+from auth.jwt_auth import get_request_subject
+from db.database import get_engine
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Vacío = sin captura
+TRAFFIC_CAPTURE_FILE = os.getenv("TRAFFIC_CAPTURE_FILE", "")
+TRAFFIC_CAPTURE_RATE = float(os.getenv("TRAFFIC_CAPTURE_RATE", "0.01"))
+
+# Valores de vocabulario fijo (sin datos personales): se guardan tal cual
+SAFE_PARAMS = {"fields", "sort", "skip", "limit", "include_archived", "overdue", "is_completed", "purge_async", "format"}
+NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}([T ][\d:.]+)?(Z|[+-]\d{2}:?\d{2})?$")
+
+_capture_lock = threading.Lock()
+
+def capture_enabled() -> bool:
+    return bool(TRAFFIC_CAPTURE_FILE) and random.random() < TRAFFIC_CAPTURE_RATE
+
+def _anonymize(name: str, value: str) -> str:
+    # Ids, números, fechas y booleanos sirven para repetir la petición; el texto libre no se guarda
+    if name in SAFE_PARAMS or NUMBER.match(value) or DATETIME.match(value) or value.lower() in ("true", "false"):
+        return value
+    return "~" + hashlib.sha256(value.encode()).hexdigest()[:12]
+
+def body_shape(value):
+    # Estructura del JSON: números, booleanos y null se conservan (ids), los textos solo su longitud
+    if isinstance(value, dict):
+        return {key: body_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [body_shape(item) for item in value]
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    return value
+
+def _parse_body(request: Request, body: bytes):
+    if not body:
+        return None
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            return body_shape(json.loads(body))
+        except ValueError:
+            return f"<invalid-json:{len(body)}>"
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        # Formularios (login): solo los nombres de los campos
+        return {"form": sorted({pair.split("=", 1)[0] for pair in body.decode(errors="replace").split("&") if pair})}
+    return f"<bytes:{len(body)}>"
+
+def _principal_role(request: Request) -> Optional[str]:
+    username = get_request_subject(request)
+    if username is None:
+        return None
+    with Session(get_engine()) as session:
+        role = session.exec(select(User.role).where(User.username == username)).first()
+    return role.value if role else None
+
+def capture_request(request: Request, body: bytes, status_code: int, duration_ms: float):
+    route = request.scope.get("route")
+    record = {
+        "ts": round(time.time(), 3),
+        "method": request.method,
+        "route": route.path if route else request.url.path,
+        "path_params": {k: _anonymize(k, str(v)) for k, v in request.path_params.items()},
+        "query": [[k, _anonymize(k, v)] for k, v in request.query_params.multi_items()],
+        "body": _parse_body(request, body),
+        "role": _principal_role(request),
+        "status": status_code,
+        "ms": round(duration_ms, 2),
+    }
+    line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+    # Una sola escritura por línea en modo append: varios workers pueden compartir el archivo
+    with _capture_lock, open(TRAFFIC_CAPTURE_FILE, "a", encoding="utf-8") as f:
+        f.write(line)
@@ -0,0 +1,39 @@
+import logging
+import os
+import time
+from db.database import create_db_and_tables, prewarm_connections
+from auth.jwt_auth import get_password_hash, get_redis
+from utils.cache import prime
+
+logger = logging.getLogger(__name__)
+
+def warm_up(only=None):
+    # Todo lo que si no se haría en la primera request tras un deploy; only = reintentar solo esos pasos
+    timings = {}
+    failed = []
+
+    def step(name, fn):
+        if only is not None and name not in only:
+            return
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            failed.append(name)
+            logger.warning(f"Warm-up step failed: {name} - {e}")
+        timings[name] = (time.perf_counter() - start) * 1000
+
+    if os.getenv("DB_CREATE_TABLES", "true").lower() == "true":
+        step("create_tables", create_db_and_tables)
+    step("db_connections", lambda: prewarm_connections(int(os.getenv("DB_PREWARM_CONNECTIONS", "2"))))
+    step("redis", lambda: get_redis().ping())
+    step("bcrypt", lambda: get_password_hash("warm-up"))
+
+    def prime_reference_data():
+        # Compila los mappers y la consulta de estados, y deja en Redis la respuesta de GET /status/
+        from routes.task_status import statuses_json
+        prime("statuses", "/status/", "all", ["statuses"], statuses_json)
+
+    step("reference_data", prime_reference_data)
+    logger.info("Warm-up: " + ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items()))
+    return timings, failed